@@ -0,0 +1,295 @@
+# -*- coding: utf8 -*-
+'''benchmarks for the ledger, the scheduler, closing and OFX import
+
+    python bench.py                          # everything, default sizes
+    python bench.py enter service -o new.json --years 40
+    python bench.py --compare old.json -o new.json
+
+Every workload is synthetic and seeded, so two runs of the same version
+do the same work.  Each benchmark is timed (best of --repeat runs) and
+then run once more under tracemalloc for its peak memory.  Results are
+printed as a table and, with -o, written as JSON; --compare prints the
+speedup over an earlier results file.
+'''
+
+from __future__ import print_function, unicode_literals, division, absolute_import
+
+import argparse
+import atexit
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from collections import OrderedDict
+from functools import partial
+
+from dateutil.relativedelta import relativedelta
+from dateutil.rrule import rrule, WEEKLY, MONTHLY, TH
+
+from simple import (D, BCM, DECIMAL, MICROS, ChartofAccounts, Credit,
+                    DateSelect, Debit, Ledger, Paycheck, Savings, bcm1,
+                    closing_entries, payday, reset_counters)
+from f1040ez import f1040ez
+
+START = datetime.datetime(2015, 1, 1)
+MONEY = dict(decimal=DECIMAL, micros=MICROS, cents=MICROS)
+
+
+def chart(accounts='accounts.csv'):
+    coa = ChartofAccounts()
+    coa.load_csv(accounts)
+    return coa
+
+
+def paydays(years):
+    return list(rrule(WEEKLY, dtstart=START, byweekday=TH,
+                      until=START + relativedelta(years=years)))
+
+
+def run_enter(coa, money, dates, rate):
+    ledger = Ledger(coa, None, money)
+    for when in dates:
+        payday(ledger, when, D('40.0'), rate, 'work')
+    return ledger
+
+
+def bench_enter(opts):
+    '''Ledger.enter: weekly paychecks for N years, four transactions each'''
+    coa = chart()
+    money = MONEY[opts.money]
+    dates = paydays(opts.years)
+    run = partial(run_enter, coa, money, dates, D('13.50'))
+    return run, 4 * len(dates), 'transactions'
+
+
+def quiet(ledger, when):
+    '''a do-little rule: move a dollar between two envelopes'''
+    money = ledger.money
+    one = money.amount('1.00')
+    ledger.enter(when, 'shuffle',
+                 Debit(when, ledger.get_account('allocated living'), one),
+                 Credit(when, ledger.get_account('cash'), one))
+
+
+def schedule(coa, years, rules, seed=0):
+    '''the household plan plus rules extra weekly or monthly BCMs'''
+    until = START + relativedelta(years=years)
+    rng = random.Random(seed)
+    startofmonth = rrule(MONTHLY, dtstart=START, bymonthday=1, until=until)
+    recurring = [
+        Paycheck(rrule(WEEKLY, dtstart=START, until=until, byweekday=TH),
+                 'work', D('40.0'), D('13.50')),
+        Savings(startofmonth, coa.get('non-taxable interest'),
+                coa.get('Roth IRA'), D('0.12') / 12),
+        Savings(startofmonth, coa.get('interest earned'),
+                coa.get('emergency fund'), D('0.0065') / 12),
+        BCM(rrule(WEEKLY, dtstart=START, until=until, byweekday=TH), bcm1),
+    ]
+    for n in range(rules):
+        dtstart = START + datetime.timedelta(rng.randrange(28))
+        freq = rng.choice((WEEKLY, MONTHLY))
+        recurring.append(BCM(rrule(freq, dtstart=dtstart, until=until), quiet))
+    return recurring, until
+
+
+def run_service(coa, money, years, rules):
+    reset_counters()
+    recurring, until = schedule(coa, years, rules)
+    ledger = Ledger(coa, None, money)
+    events = 0
+    for v in DateSelect(recurring).service_loop(ledger, until):
+        events += 1
+    return events
+
+
+def bench_service(opts):
+    '''DateSelect.service_loop: the household plan plus K extra rules'''
+    coa = chart()
+    money = MONEY[opts.money]
+    run = partial(run_service, coa, money, opts.years, opts.rules)
+    return run, run(), 'events'
+
+
+def simulated(opts):
+    '''a ledger after opts.years of the household plan'''
+    coa = chart()
+    reset_counters()
+    recurring, until = schedule(coa, opts.years, 0)
+    ledger = Ledger(coa, None, MONEY[opts.money])
+    for v in DateSelect(recurring).service_loop(ledger, until):
+        pass
+    return ledger, until
+
+
+def run_closing(ledger, years):
+    with contextlib.redirect_stdout(io.StringIO()):
+        for year in years:
+            branch = ledger.fork()
+            closing_entries(branch, datetime.date(year, 12, 31), 'year')
+
+
+def bench_closing(opts):
+    '''closing_entries for every year of a simulated ledger'''
+    ledger, until = simulated(opts)
+    years = range(START.year, until.year)
+    return partial(run_closing, ledger, years), len(years), 'closings'
+
+
+def run_f1040ez(ledger, years):
+    for year in years:
+        when = datetime.date(year, 12, 31)
+        # f1040ez enters the refund or payment: keep it off the ledger
+        branch = ledger.fork()
+        f1040ez(branch, branch.balances_as_of(when), when)
+
+
+def bench_f1040ez(opts):
+    '''f1040ez from the balances at every year end of a simulated ledger'''
+    ledger, until = simulated(opts)
+    years = range(START.year, until.year)
+    return partial(run_f1040ez, ledger, years), len(years), 'returns'
+
+
+def write_ofx(directory, files, size, seed=0):
+    from myfi.ofxgen import statement, synthetic
+    names = []
+    for n in range(files):
+        start = datetime.date(2016, 1, 1) + datetime.timedelta(n * size // 3)
+        name = os.path.join(directory, 'stmt{:04}.ofx'.format(n))
+        with open(name, 'w') as fo:
+            fo.write(statement('324377516', '644930~1',
+                               synthetic(size, start, seed=seed + n),
+                               D('100.00')))
+        names.append(name)
+    return names
+
+
+def run_loadofx(names):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from myfi.models import Base
+    from myfi.loadofx import loadofx
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    with contextlib.redirect_stdout(io.StringIO()):
+        loadofx(sessionmaker(bind=engine)(), names)
+    engine.dispose()
+
+
+def bench_loadofx(opts):
+    '''myfi.loadofx.loadofx: M statement files of S transactions each'''
+    directory = tempfile.mkdtemp(prefix='myfi-bench-')
+    atexit.register(shutil.rmtree, directory, True)
+    names = write_ofx(directory, opts.files, opts.size)
+    return partial(run_loadofx, names), opts.files * opts.size, 'entries'
+
+
+BENCHMARKS = OrderedDict([
+    ('enter', bench_enter),
+    ('service', bench_service),
+    ('closing', bench_closing),
+    ('f1040ez', bench_f1040ez),
+    ('loadofx', bench_loadofx),
+])
+
+
+def measure(name, opts):
+    run, ops, unit = BENCHMARKS[name](opts)
+    best = None
+    for n in range(opts.repeat):
+        t = time.perf_counter()
+        run()
+        t = time.perf_counter() - t
+        best = t if best is None else min(best, t)
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return OrderedDict([
+        ('name', name), ('seconds', best), ('ops', ops), ('unit', unit),
+        ('per_second', ops / best if best else None),
+        ('peak_kb', peak // 1024),
+    ])
+
+
+def version():
+    try:
+        return subprocess.run(
+            ['git', 'describe', '--always', '--dirty'], capture_output=True,
+            text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def report(results, baseline=None):
+    old = {r['name']: r for r in baseline['results']} if baseline else {}
+    lines = ['{:10} {:>10} {:>20} {:>14} {:>10}{}'.format(
+        'benchmark', 'seconds', 'ops', 'per second', 'peak KiB',
+        '    speedup' if old else '')]
+    for r in results:
+        line = '{:10} {:10.4f} {:>20} {:14.1f} {:10}'.format(
+            r['name'], r['seconds'], '{} {}'.format(r['ops'], r['unit']),
+            r['per_second'], r['peak_kb'])
+        was = old.get(r['name'])
+        if was:
+            line += '    {:6.2f}x'.format(was['seconds'] / r['seconds'])
+        lines.append(line)
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('benchmarks', nargs='*', metavar='NAME',
+                        help='any of: ' + ', '.join(BENCHMARKS))
+    parser.add_argument('--years', type=int, default=10,
+                        help='years of weekly paychecks (N)')
+    parser.add_argument('--rules', type=int, default=100,
+                        help='extra recurring rules (K)')
+    parser.add_argument('--files', type=int, default=20,
+                        help='OFX files to import (M)')
+    parser.add_argument('--size', type=int, default=100,
+                        help='transactions per OFX file (S)')
+    parser.add_argument('--money', choices=sorted(MONEY), default='decimal')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', '-o', help='write results as JSON')
+    parser.add_argument('--compare', help='earlier JSON results')
+    opts = parser.parse_args(argv)
+
+    names = opts.benchmarks or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            parser.error('unknown benchmark {}'.format(name))
+    results = [measure(name, opts) for name in names]
+
+    baseline = None
+    if opts.compare:
+        with open(opts.compare) as fi:
+            baseline = json.load(fi)
+    for line in report(results, baseline):
+        print(line)
+
+    if opts.output:
+        params = OrderedDict((k, getattr(opts, k)) for k in (
+            'years', 'rules', 'files', 'size', 'money', 'repeat'))
+        with open(opts.output, 'w') as fo:
+            json.dump(OrderedDict([
+                ('version', version()),
+                ('python', platform.python_version()),
+                ('when', datetime.datetime.now().isoformat(timespec='seconds')),
+                ('params', params),
+                ('results', results),
+            ]), fo, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    main()
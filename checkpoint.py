@@ -0,0 +1,79 @@
+# -*- coding: utf8 -*-
+'''save a DateSelect simulation part way through and carry on later
+
+    ds = DateSelect(recurring)
+    for v, what, when in ds.service_loop(ledger, until):
+        if when >= midway:
+            break
+    data = checkpoint(ledger, ds)
+
+    ledger, ds = resume(data)         # same run, carried on
+    for v, what, when in ds.service_loop(ledger, until):
+        ...
+
+A checkpoint is a pickle of the ledger, the DateSelect with its scheduled
+(when, Recurring) events and the transaction id / Recurring order
+counters.  Each Recurring is saved as its recurrence rule and the last
+date it produced, and resumes from the next occurrence after that.
+Resuming the same checkpoint again gives an independent copy, so one
+prefix can be forked into what-if branches:
+
+    for hours in (D('16.0'), D('40.0')):
+        ledger, ds = resume(data)
+        for when, r in ds.pending:
+            if isinstance(r, Paycheck):
+                r.hours = hours
+        ...
+
+Everything reachable from the ledger and the Recurring objects must be
+picklable: BCM rules have to be module-level functions, not lambdas.
+'''
+
+from __future__ import print_function, unicode_literals, division, absolute_import
+
+import pickle
+from collections import namedtuple
+
+from simple import Ledger, Recurring, reset_counters
+
+Checkpoint = namedtuple('Checkpoint', 'ledger,select,tid,order')
+
+
+def _counters():
+    '''the last transaction id and Recurring order number handed out'''
+    tid = Ledger._nextid() - 1
+    order = Recurring.nextid() - 1
+    reset_counters(tid, order)
+    return tid, order
+
+
+def checkpoint(ledger, select):
+    '''the state of a simulation, as bytes
+
+    Take it between iterations of select.service_loop (or before the
+    first); every yielded event has already been rescheduled.
+    '''
+    tid, order = _counters()
+    return pickle.dumps(Checkpoint(ledger, select, tid, order),
+                        pickle.HIGHEST_PROTOCOL)
+
+
+def resume(data):
+    '''a fresh (ledger, select) from checkpoint data
+
+    The id counters are set back to where they were at the checkpoint, so
+    a resumed run posts the same transactions as the uninterrupted one.
+    '''
+    cp = pickle.loads(data)
+    reset_counters(cp.tid, cp.order)
+    return cp.ledger, cp.select
+
+
+def save(fname, ledger, select):
+    with open(fname, 'wb') as fo:
+        fo.write(checkpoint(ledger, select))
+
+
+def load(fname):
+    with open(fname, 'rb') as fi:
+        return resume(fi.read())
@@ -0,0 +1,286 @@
+# -*- coding: utf8 -*-
+'''loans, monthly loan payments and the debt snowball
+
+    car = Loan(coa.get('car loan'), D('8500.00'), D('0.049'), D('180.00'))
+    visa = Loan(coa.get('visa'), D('2300.00'), D('0.219'), D('60.00'))
+    ledger = Ledger(coa, opening([car, visa]))
+    payments = LoanPayments(startofmonth, [car, visa], coa.get('cash'),
+                            extra=D('250.00'), order=snowball)
+
+    for plan in optimize([car, visa], extras=range(0, 1001, 50))[:5]:
+        print(plan.order, plan.extra, plan.months, plan.interest)
+
+A payment plan pays every loan its minimum and puts the extra, plus the
+minimums of loans already paid off, on the first unpaid loan in its
+order: smallest balance first (snowball), highest rate first
+(avalanche), or any ordering you give it.
+
+optimize() amortizes every (order, extra) plan at once with numpy, one
+row per plan, in float dollars; LoanPayments posts the same plan to a
+ledger month by month, rounded to the cent.  They agree on the payoff
+months; the interest totals can drift apart by a few cents where a half
+cent of interest rounds differently in binary.
+'''
+
+from __future__ import print_function, unicode_literals, division, absolute_import
+
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from simple import D, Credit, Debit, Recurring
+
+MONTHS = D(12)
+
+
+class Loan:
+    '''what is owed on a liability account, at an annual rate'''
+
+    def __init__(self, account, balance, apr, minimum, name=None):
+        self.account = account
+        self.balance = D(balance)
+        self.apr = D(apr)
+        self.minimum = D(minimum)
+        self.name = name or account.name
+
+    def __repr__(self):
+        return '<Loan {} {} @ {}>'.format(self.name, self.balance, self.apr)
+
+
+def opening(loans, money=None):
+    '''opening balances for a Ledger holding loans'''
+    if money is None:
+        return {loan.account: loan.balance for loan in loans}
+    return {loan.account: money.amount(loan.balance) for loan in loans}
+
+
+def snowball(loans):
+    '''smallest balance first'''
+    return sorted(loans, key=lambda loan: loan.balance)
+
+
+def avalanche(loans):
+    '''highest rate first'''
+    return sorted(loans, key=lambda loan: -loan.apr)
+
+
+ORDERS = dict(snowball=snowball, avalanche=avalanche)
+
+
+def ordering(order, loans):
+    '''loans in payoff order; order is a name in ORDERS, a function of the
+    loans or an explicit sequence of them'''
+    if isinstance(order, str):
+        order = ORDERS[order]
+    if callable(order):
+        return list(order(loans))
+    order = list(order)
+    if sorted(map(id, order)) != sorted(map(id, loans)):
+        raise ValueError('an ordering must list every loan once')
+    return order
+
+
+class LoanPayments(Recurring):
+    '''charge a month's interest on each loan and pay them down
+
+    The monthly budget is every loan's minimum plus extra; what a loan
+    does not need goes to the next unpaid loan in order.  Between payoffs
+    the payments do not change, so with DateSelect(fast_forward=True) the
+    months up to the next payoff are amortized in closed form and posted
+    as one interest and one payment entry per loan.
+    '''
+    CLOSED_FORM = True
+
+    def __init__(self, recur, loans, source, extra=0, order=snowball,
+                 interest='interest paid'):
+        super(LoanPayments, self).__init__(recur)
+        self.loans = ordering(order, loans)
+        self.source = source
+        self.extra = D(extra)
+        self.interest = interest
+
+    def service(self, ledger, when):
+        money = ledger.money
+        expense = ledger.get_account(self.interest)
+        owed = []
+        for loan in self.loans:
+            bal = ledger.get_balance(loan.account)
+            intr = money.round(money.mul(bal, loan.apr / MONTHS))
+            if intr > money.ZERO:
+                ledger.enter(when, 'interest on {}'.format(loan.name),
+                             Debit(when, expense, intr),
+                             Credit(when, loan.account, intr))
+                bal += intr
+            owed.append(bal)
+
+        budget = money.amount(self.extra)
+        for loan in self.loans:
+            budget += money.amount(loan.minimum)
+        pays = []
+        for loan, bal in zip(self.loans, owed):
+            pay = min(money.amount(loan.minimum), bal)
+            pays.append(max(pay, money.ZERO))
+        budget -= sum(pays, money.ZERO)
+        for i, bal in enumerate(owed):
+            more = min(budget, bal - pays[i])
+            if more > money.ZERO:
+                pays[i] += more
+                budget -= more
+
+        for loan, pay in zip(self.loans, pays):
+            if pay > money.ZERO:
+                ledger.enter(when, 'payment on {}'.format(loan.name),
+                             Debit(when, loan.account, pay),
+                             Credit(when, self.source, pay))
+        return pays
+
+    def accounts(self, ledger):
+        return {self.source, ledger.get_account(self.interest)} | \
+            {loan.account for loan in self.loans}
+
+    def steady(self, ledger):
+        '''(loan, balance, payment) for the unpaid loans, as long as none
+        is paid off, and how many months that is sure to last'''
+        money = ledger.money
+        budget = money.amount(self.extra)
+        live = []
+        for loan in self.loans:
+            budget += money.amount(loan.minimum)
+            bal = ledger.get_balance(loan.account)
+            if bal > money.ZERO:
+                live.append([loan, bal, money.amount(loan.minimum)])
+        if not live:
+            return [], None
+        live[0][2] += budget - sum((pay for l, b, pay in live), money.ZERO)
+
+        months = None
+        for loan, bal, pay in live:
+            # the payment covers what is owed in month t once
+            # (1 + r)^t >= pay / (pay - bal r)
+            b, p = float(bal), float(pay)
+            r = float(loan.apr) / 12
+            if p <= b * r:
+                continue
+            t = b / p if r == 0 else math.log(p / (p - b * r)) / math.log1p(r)
+            # one month short, for the rounding
+            t = max(math.ceil(t) - 2, 0)
+            months = t if months is None else min(months, t)
+        return live, months
+
+    def advance(self, ledger, dates):
+        money = ledger.money
+        expense = ledger.get_account(self.interest)
+        i = 0
+        while i < len(dates):
+            live, months = self.steady(ledger)
+            k = len(dates) - i if months is None else min(months, len(dates) - i)
+            if k < 2:
+                self.service(ledger, dates[i])
+                i += 1
+                continue
+            when = dates[i + k - 1]
+            for loan, bal, pay in live:
+                rate = loan.apr / MONTHS
+                paid = pay * k
+                if rate:
+                    growth = (1 + rate) ** k
+                    # one-off factors, kept out of the money's rate cache
+                    left = money.round(
+                        money.mul(bal, growth, cache=False) -
+                        money.mul(pay, (growth - 1) / rate, cache=False))
+                else:
+                    left = bal - paid
+                intr = left - bal + paid
+                if intr > money.ZERO:
+                    ledger.enter(when, 'interest on {}, {} months'.format(
+                        loan.name, k),
+                        Debit(when, expense, intr),
+                        Credit(when, loan.account, intr))
+                ledger.enter(when, 'payment on {}, {} months'.format(
+                    loan.name, k),
+                    Debit(when, loan.account, paid),
+                    Credit(when, self.source, paid))
+            i += k
+
+
+Plan = namedtuple('Plan', 'order,extra,months,interest,payoff')
+
+
+def amortize(balances, rates, minimums, priority, extras, limit=600):
+    '''amortize many payment plans at once
+
+    balances, rates (monthly) and minimums have one column per loan and
+    one row per plan; priority[p] lists plan p's loan columns in payoff
+    order and extras[p] is its extra payment.  Returns the months each
+    loan took to pay off (-1 if not within limit) and the interest each
+    plan paid.
+    '''
+    bal = np.array(balances, dtype=float)
+    rates = np.asarray(rates, dtype=float)
+    minimums = np.asarray(minimums, dtype=float)
+    priority = np.asarray(priority)
+    plans, loans = bal.shape
+    budget = minimums.sum(axis=1) + np.asarray(extras, dtype=float)
+    payoff = np.full((plans, loans), -1)
+    payoff[bal <= 0] = 0
+    interest = np.zeros(plans)
+    rows = np.arange(plans)[:, None]
+    for month in range(1, limit + 1):
+        owed = bal > 0
+        if not owed.any():
+            break
+        # interest is charged in cents, as LoanPayments posts it
+        intr = np.round(bal * rates, 2) * owed
+        interest += intr.sum(axis=1)
+        bal += intr
+        pay = np.minimum(minimums, bal) * owed
+        left = budget - pay.sum(axis=1)
+        rest = (bal - pay)[rows, priority]
+        before = np.cumsum(rest, axis=1) - rest
+        more = np.clip(left[:, None] - before, 0, rest)
+        pay[rows, priority] += more
+        bal = np.round(bal - pay, 2)
+        payoff[owed & (bal <= 0)] = month
+    return payoff, interest
+
+
+def optimize(loans, extras, orders=('snowball', 'avalanche'), limit=600):
+    '''every (order, extra) plan for loans, best first
+
+    orders are names in ORDERS, functions or explicit orderings of loans.
+    Plans are ranked by the months until the last loan is paid, then by
+    total interest; plans that do not finish within limit months come
+    last.
+    '''
+    loans = list(loans)
+    extras = list(extras)
+    col = {id(loan): i for i, loan in enumerate(loans)}
+    priority = []
+    plans = []
+    for order in orders:
+        cols = [col[id(loan)] for loan in ordering(order, loans)]
+        for extra in extras:
+            priority.append(cols)
+            plans.append((order, extra))
+    n = len(plans)
+    row = lambda values: np.tile([float(v) for v in values], (n, 1))
+    payoff, interest = amortize(
+        row(loan.balance for loan in loans),
+        row(loan.apr / MONTHS for loan in loans),
+        row(loan.minimum for loan in loans),
+        priority, [float(extra) for order, extra in plans], limit)
+
+    result = []
+    for p, (order, extra) in enumerate(plans):
+        done = (payoff[p] >= 0).all()
+        months = int(payoff[p].max()) if done else None
+        name = order if isinstance(order, str) else getattr(
+            order, '__name__', 'custom')
+        result.append(Plan(name, extra, months,
+                           D('{:.2f}'.format(interest[p])),
+                           dict(zip((loan.name for loan in loans),
+                                    payoff[p].tolist()))))
+    result.sort(key=lambda plan: (plan.months is None, plan.months or 0,
+                                  plan.interest))
+    return result
@@ -3,7 +3,7 @@
 SINGLE = 0
 import datetime
 from decimal import Decimal as D
-from simple import Debit,Credit
+from simple import Debit, Credit, dollars
 ZERO = D('0.00')
 
 
@@ -11,40 +11,41 @@ def f1040ez(ledger, balances, when, filestatus=SINGLE, dependents=0):
     '''complete tax form, deposit refund on when
     '''
 
+    money = ledger.money
     wts = balances.get(ledger.get_account("w-2 income"))
-    tintr = balances.get(ledger.get_account("interest earned")).quantize(ZERO)
-    uicomp = ZERO
+    tintr = money.round(balances.get(ledger.get_account("interest earned")))
+    uicomp = money.ZERO
 
     agi = wts + tintr + uicomp
 
     def wks5():
-        a = wts + D('350.00')
-        b = D('1050.00')
+        a = wts + money.amount('350.00')
+        b = money.amount('1050.00')
         c = max(a, b)
-        d = D('6300.00') if filestatus == SINGLE else D('12600.00')
+        d = money.amount('6300.00' if filestatus == SINGLE else '12600.00')
         e = min(c, d)
-        f = D('4000.00') * dependents
+        f = money.amount('4000.00') * dependents
         return e + f
 
     stded = wks5()
-    tinc = max(ZERO, agi - stded)
+    tinc = max(money.ZERO, agi - stded)
 
     fitacct = ledger.get_account('Federal Income Tax')
     fit = balances.get(fitacct)
-    eic = ZERO
-    ntcpe = ZERO
+    eic = money.ZERO
+    ntcpe = money.ZERO
     tpc = fit + eic
 
-    tax = (tinc * D('.1')).quantize(ZERO)
-    obama = ZERO
+    tax = money.round(money.mul(tinc, D('.1')))
+    obama = money.ZERO
     ttax = tax + obama
 
     refund = tpc - ttax
     if refund < 0:
         owe = -refund
-        refund = ZERO
+        refund = money.ZERO
     else:
-        owe = ZERO
+        owe = money.ZERO
 
     if refund > ZERO:
         ledger.enter(when, 'Federal Income Tax Refund for {}'.format(when.year - 1),
@@ -61,19 +62,19 @@ def f1040ez(ledger, balances, when, filestatus=SINGLE, dependents=0):
 
     return dict(
         Form='1040ez',
-        L01=wts,
-        L02=tintr,
-        L03=uicomp,
-        L04=agi,
-        L05=stded,
-        L06=tinc,
-        L07=fit,
-        L08a=eic,
-        L08b=ntcpe,
-        L09=tpc,
-        L10=tax,
-        L11=obama,
-        L12=ttax,
-        L13a=refund,
-        L14=owe,
+        L01=dollars(wts),
+        L02=dollars(tintr),
+        L03=dollars(uicomp),
+        L04=dollars(agi),
+        L05=dollars(stded),
+        L06=dollars(tinc),
+        L07=dollars(fit),
+        L08a=dollars(eic),
+        L08b=dollars(ntcpe),
+        L09=dollars(tpc),
+        L10=dollars(tax),
+        L11=dollars(obama),
+        L12=dollars(ttax),
+        L13a=dollars(refund),
+        L14=dollars(owe),
     )
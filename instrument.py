@@ -0,0 +1,130 @@
+# -*- coding: utf8 -*-
+'''where a simulation spends its time, per Recurring
+
+    stats = ServiceStats()
+    for v in DateSelect(recurring).service_loop(ledger, until, stats):
+        pass
+    for line in stats.table():
+        print(line)
+    stats.dump_stats('run.prof')   # python -m pstats run.prof
+
+Each event is recorded against its Recurring: how often it ran, the
+total and longest time service() (or advance()) took, and how many
+transactions and entries it added to the ledger.  Rows can be grouped by
+Recurring instance or by kind: the class, or for BCM the function it
+wraps.  Without stats, service_loop runs untimed.
+'''
+
+from __future__ import print_function, unicode_literals, division, absolute_import
+
+import inspect
+import json
+import marshal
+from collections import OrderedDict
+from functools import partial
+
+FIELDS = ('calls', 'seconds', 'max', 'transactions', 'entries')
+
+
+def function(r):
+    '''the function doing r's work: a BCM's rule, else its service()'''
+    f = getattr(r, '_service', None)
+    while isinstance(f, partial):
+        f = f.func
+    return f if f is not None else type(r).service
+
+
+def kind(r):
+    f = getattr(r, '_service', None)
+    if f is None:
+        return type(r).__name__
+    return '{}({})'.format(type(r).__name__, getattr(function(r), '__name__', '?'))
+
+
+def label(r):
+    return '{} #{}'.format(kind(r), r.order)
+
+
+class ServiceStats:
+
+    def __init__(self):
+        # Recurring -> [calls, seconds, max, transactions, entries]
+        self.recurring = OrderedDict()
+
+    def record(self, what, seconds, transactions, entries):
+        row = self.recurring.get(what)
+        if row is None:
+            row = self.recurring[what] = [0, 0.0, 0.0, 0, 0]
+        row[0] += 1
+        row[1] += seconds
+        if seconds > row[2]:
+            row[2] = seconds
+        row[3] += transactions
+        row[4] += entries
+
+    def rows(self, by='kind'):
+        '''dicts of name and FIELDS, slowest first; by 'kind' or 'instance\''''
+        name = kind if by == 'kind' else label
+        totals = OrderedDict()
+        for r, row in self.recurring.items():
+            key = name(r)
+            total = totals.get(key)
+            if total is None:
+                totals[key] = list(row)
+            else:
+                total[0] += row[0]
+                total[1] += row[1]
+                total[2] = max(total[2], row[2])
+                total[3] += row[3]
+                total[4] += row[4]
+        rows = [OrderedDict([('name', key)] + list(zip(FIELDS, row)))
+                for key, row in totals.items()]
+        rows.sort(key=lambda row: -row['seconds'])
+        return rows
+
+    def table(self, by='kind'):
+        '''the rows as aligned text lines'''
+        head = ['name', 'calls', 'seconds', 'max ms', 'per call us',
+                'transactions', 'entries']
+        lines = [[row['name'], str(row['calls']),
+                  '{:.4f}'.format(row['seconds']),
+                  '{:.3f}'.format(row['max'] * 1e3),
+                  '{:.1f}'.format(row['seconds'] / row['calls'] * 1e6),
+                  str(row['transactions']), str(row['entries'])]
+                 for row in self.rows(by)]
+        widths = [max(len(l[i]) for l in lines + [head])
+                  for i in range(len(head))]
+        out = ['  '.join([head[0].ljust(widths[0])] +
+                         [h.rjust(w) for h, w in zip(head[1:], widths[1:])])]
+        for l in lines:
+            out.append('  '.join([l[0].ljust(widths[0])] +
+                                 [c.rjust(w) for c, w in zip(l[1:], widths[1:])]))
+        return out
+
+    def to_json(self, by='kind', **kw):
+        return json.dumps(self.rows(by), **kw)
+
+    def pstats(self):
+        '''the timings in cProfile's format, one function per kind
+
+        {(file, line, name): (calls, calls, seconds, seconds, {})}, what
+        pstats.Stats reads from a dump_stats() file.
+        '''
+        stats = {}
+        for r, row in self.recurring.items():
+            f = function(r)
+            try:
+                fname = inspect.getsourcefile(f) or '~'
+                line = inspect.getsourcelines(f)[1]
+            except (TypeError, OSError):
+                fname, line = '~', 0
+            key = (fname, line, kind(r))
+            cc, nc, tt, ct, callers = stats.get(key, (0, 0, 0.0, 0.0, {}))
+            stats[key] = (cc + row[0], nc + row[0], tt + row[1], ct + row[1],
+                          callers)
+        return stats
+
+    def dump_stats(self, fname):
+        '''write a file pstats.Stats (or snakeviz, ...) can read'''
+        with open(fname, 'wb') as fo:
+            marshal.dump(self.pstats(), fo)
@@ -0,0 +1,140 @@
+# -*- coding: utf8 -*-
+'''columnar storage for Ledger.transactions
+
+A Journal keeps transactions as parallel arrays instead of one
+Transaction tuple and several Entry objects each.  Dates, accounts and
+memos repeat endlessly in a simulation, so they are interned and stored
+as small integer ids.  Reading a transaction back builds Transaction and
+Entry views, so printing, the posting index and the rules work unchanged.
+Amounts are int64 too: MICROS amounts as they are, Decimal amounts in
+millionths of a dollar, with their exponent in a byte array beside them
+so they read back exactly as they were entered ('5.00' stays '5.00').
+The odd Decimal amount that is not a whole number of millionths is kept
+aside as it is:
+
+    ledger = Ledger(coa, None, MICROS, transactions=Journal(MICROS))
+'''
+
+from __future__ import print_function, unicode_literals, division, absolute_import
+
+from array import array
+from decimal import Decimal
+
+from simple import DECIMAL, MICROS, Entry, FixedMoney, Transaction
+
+BIG = 1 << 63
+SCALE = Decimal(FixedMoney.UNITS)
+
+
+class Interned:
+    '''values stored once, referred to by their position'''
+    __slots__ = ('values', 'ids')
+
+    def __init__(self):
+        self.values = [None]
+        self.ids = {None: 0}
+
+    def id(self, value):
+        try:
+            return self.ids[value]
+        except KeyError:
+            i = self.ids[value] = len(self.values)
+            self.values.append(value)
+            return i
+
+
+class Journal:
+
+    def __init__(self, money=DECIMAL):
+        self.money = money
+        self.dates = Interned()
+        self.accounts = Interned()
+        self.memos = Interned()
+        # one row per transaction
+        self.tid = array('q')
+        self.tdate = array('i')
+        self.tmemo = array('i')
+        self.start = array('i')
+        # one row per entry; dtorig and dtposted are interned as a pair
+        self.dtpair = array('i')
+        self.account = array('i')
+        self.debit = array('b')
+        self.amount = array('q')
+        self.exponent = array('b')
+        self.memo = array('i')
+        # Decimal amounts that are not whole millionths, by entry row
+        self.odd = {}
+
+    def append(self, tran):
+        dates = self.dates.id
+        memos = self.memos.id
+        amounts = self.amount
+        exponents = self.exponent
+        micros = self.money is MICROS
+        self.tid.append(tran.tid)
+        self.tdate.append(dates(tran.dtposted))
+        self.tmemo.append(memos(tran.memo))
+        self.start.append(len(self.account))
+        for e in tran.entries:
+            self.dtpair.append(dates((e.dtorig, e.dtposted)))
+            self.account.append(self.accounts.id(e.account))
+            self.debit.append(e.debit)
+            amount = e.amount
+            if not micros:
+                scaled = amount * SCALE
+                try:
+                    amount = int(scaled)
+                except (ValueError, OverflowError):
+                    amount = None
+                exp = e.amount.as_tuple().exponent
+                if amount != scaled or not -BIG < amount < BIG or \
+                        not -128 <= exp < 128 or \
+                        (not amount and e.amount.is_signed()):
+                    self.odd[len(amounts)] = e.amount
+                    amount = exp = 0
+                exponents.append(exp)
+            amounts.append(amount)
+            self.memo.append(memos(e.memo))
+
+    def _amount(self, n):
+        a = self.amount[n]
+        if self.money is MICROS:
+            return a
+        if not a and n in self.odd:
+            return self.odd[n]
+        # back to the coefficient the amount had at its own exponent
+        e = self.exponent[n]
+        if e >= -6:
+            return Decimal(a // 10 ** (6 + e)).scaleb(e)
+        return Decimal(a * 10 ** (-6 - e)).scaleb(e)
+
+    def __len__(self):
+        return len(self.tid)
+
+    def _view(self, i):
+        dates = self.dates.values
+        memos = self.memos.values
+        accounts = self.accounts.values
+        j = self.start[i]
+        k = self.start[i + 1] if i + 1 < len(self.start) else len(self.account)
+        entries = []
+        for n in range(j, k):
+            dtorig, dtposted = dates[self.dtpair[n]]
+            entries.append(Entry(dtorig, dtposted, accounts[self.account[n]],
+                                 bool(self.debit[n]), self._amount(n),
+                                 memos[self.memo[n]]))
+        return Transaction(self.tid[i], dates[self.tdate[i]],
+                           memos[self.tmemo[i]], tuple(entries))
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._view(n) for n in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('journal index out of range')
+        return self._view(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._view(i)
@@ -0,0 +1,134 @@
+# -*- coding: utf8 -*-
+'''Monte Carlo risk picture for Savings accounts
+
+Run the plan once as usual, then replay each Savings account's deposits
+and withdrawals under thousands of random return paths at once:
+
+    sim = montecarlo(ledger, [roth], months, NormalReturns(0.07, 0.15),
+                     paths=10000)
+    low, mid, high = sim.percentiles(roth.dest, (5, 50, 95))
+    sim.probability(roth.dest, 1000000)
+
+Balances are float dollars in (paths x dates) matrices; the deposits come
+from the ledger's posting index, less the interest the Savings itself
+posted, and are the same on every path.
+'''
+
+from __future__ import print_function, unicode_literals, division, absolute_import
+
+from bisect import bisect_left
+
+import numpy as np
+
+from simple import dollars
+
+
+class FixedReturns:
+    '''the same monthly rate every month, as Savings assumes'''
+
+    def __init__(self, rate):
+        self.rate = float(rate)
+
+    def draw(self, rng, paths, months):
+        return np.full((paths, months), self.rate)
+
+
+class NormalReturns:
+    '''monthly returns ~ normal, from an annual mean and volatility'''
+
+    def __init__(self, mean, stdev):
+        self.mean = float(mean) / 12
+        self.stdev = float(stdev) / 12 ** 0.5
+
+    def draw(self, rng, paths, months):
+        return rng.normal(self.mean, self.stdev, (paths, months))
+
+
+class LognormalReturns:
+    '''monthly growth factors ~ lognormal, from an annual mean and volatility
+
+    mean and stdev describe log returns, so growth never goes below zero.
+    '''
+
+    def __init__(self, mean, stdev):
+        self.mean = float(mean) / 12
+        self.stdev = float(stdev) / 12 ** 0.5
+
+    def draw(self, rng, paths, months):
+        return np.expm1(rng.normal(self.mean, self.stdev, (paths, months)))
+
+
+class BootstrapReturns:
+    '''monthly returns resampled, with replacement, from history'''
+
+    def __init__(self, history):
+        self.history = np.asarray([float(r) for r in history])
+
+    def draw(self, rng, paths, months):
+        return rng.choice(self.history, (paths, months))
+
+
+def flows(ledger, savings, dates):
+    '''balance of savings.dest at the first date and the net deposits into
+    it up to each later date, without the interest savings posted'''
+    acct = savings.dest
+    bal = np.array([float(dollars(ledger.get_balance(acct, as_of=d)))
+                    for d in dates])
+    interest = np.zeros(len(dates))
+    days = [d.toordinal() for d in dates]
+    for t in savings.transactions:
+        i = bisect_left(days, t.dtposted.toordinal())
+        if i < len(days):
+            interest[i] += float(dollars(t.entries[0].amount))
+    return bal[0], np.diff(bal) - interest[1:]
+
+
+class MonteCarlo:
+    '''balances[acct] is a (paths x dates) matrix of float dollars'''
+
+    def __init__(self, dates, balances):
+        self.dates = dates
+        self.balances = balances
+
+    def percentiles(self, acct, q=(5, 25, 50, 75, 95)):
+        '''one row per percentile in q, one column per date'''
+        return np.percentile(self.balances[acct], q, axis=0)
+
+    def bands(self, q=(5, 25, 50, 75, 95)):
+        return {acct: self.percentiles(acct, q) for acct in self.balances}
+
+    def probability(self, acct, goal, when=None):
+        '''fraction of paths with at least goal in acct (at the end, or
+        on the last date not after when)'''
+        j = -1
+        if when is not None:
+            j = bisect_left([d.toordinal() for d in self.dates],
+                            when.toordinal() + 1) - 1
+            if j < 0:
+                raise ValueError('{} is before the first date'.format(when))
+        return float(np.mean(self.balances[acct][:, j] >= float(goal)))
+
+
+def montecarlo(ledger, savings, dates, model, paths=10000, seed=None):
+    '''simulate the Savings in savings over dates under random returns
+
+    ledger is the finished deterministic run.  model is a return model, or
+    a dict of them keyed by Savings; Savings sharing a model instance see
+    the same draws (one market).
+    '''
+    rng = np.random.default_rng(seed)
+    months = len(dates) - 1
+    draws = {}
+    balances = {}
+    for s in savings:
+        m = model.get(s) if isinstance(model, dict) else model
+        if m not in draws:
+            draws[m] = m.draw(rng, paths, months)
+        growth = 1.0 + draws[m]
+        opening, deposits = flows(ledger, s, dates)
+        b = np.empty((paths, months + 1))
+        b[:, 0] = opening
+        for j in range(months):
+            b[:, j + 1] = b[:, j] * growth[:, j] + deposits[j]
+        balances[s.dest] = b
+    return MonteCarlo(dates, balances)
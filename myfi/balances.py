@@ -0,0 +1,94 @@
+"""Daily account balances, materialized from the entries table.
+
+The balance is the running total of imported entries, so it is the bank's
+balance less whatever the account held before its first imported entry;
+reconcile() measures that offset against a statement.
+"""
+from decimal import Decimal
+
+from sqlalchemy import select
+
+from myfi.models import DailyBalance, Entry, Statement
+
+ZERO = Decimal('0.00')
+
+
+def refresh(conn, account_id, since):
+    """Recompute an account's daily balances from the day since on.
+
+    Only the rows from since on are rewritten, starting from the last
+    balance before it; the entries are read with one range scan over
+    (account_id, dtposted).
+    """
+    t = DailyBalance.__table__
+    e = Entry.__table__
+    opening = conn.execute(
+        select(t.c.balance)
+        .where(t.c.account_id == account_id, t.c.day < since)
+        .order_by(t.c.day.desc()).limit(1)).scalar() or ZERO
+
+    days = []
+    for day, amount in conn.execute(
+            select(e.c.dtposted, e.c.amount)
+            .where(e.c.account_id == account_id, e.c.dtposted >= since)
+            .order_by(e.c.dtposted)):
+        if days and days[-1][0] == day:
+            days[-1][1] += amount
+        else:
+            days.append([day, amount])
+
+    conn.execute(t.delete().where(t.c.account_id == account_id,
+                                  t.c.day >= since))
+    rows = []
+    balance = opening
+    for day, amount in days:
+        balance += amount
+        rows.append(dict(account_id=account_id, day=day,
+                         amount=amount, balance=balance))
+    if rows:
+        conn.execute(t.insert(), rows)
+
+
+def refresh_entries(conn, rows):
+    """Refresh the daily balances touched by newly inserted entry rows."""
+    since = {}
+    for row in rows:
+        account_id = row['account_id']
+        day = row['dtposted']
+        if account_id not in since or day < since[account_id]:
+            since[account_id] = day
+    for account_id, day in since.items():
+        refresh(conn, account_id, day)
+
+
+def history(conn, account_id, start=None, end=None):
+    """(day, balance) for each day with activity from start to end."""
+    t = DailyBalance.__table__
+    q = select(t.c.day, t.c.balance).where(t.c.account_id == account_id)
+    if start is not None:
+        q = q.where(t.c.day >= start)
+    if end is not None:
+        q = q.where(t.c.day <= end)
+    return conn.execute(q.order_by(t.c.day)).all()
+
+
+def balance(conn, account_id, day):
+    """The account's balance at the end of day."""
+    t = DailyBalance.__table__
+    return conn.execute(
+        select(t.c.balance)
+        .where(t.c.account_id == account_id, t.c.day <= day)
+        .order_by(t.c.day.desc()).limit(1)).scalar() or ZERO
+
+
+def reconcile(conn, statement_id):
+    """Statement balance less the imported balance on its end date.
+
+    Successive statements of a fully imported account reconcile to the
+    same figure: the account's balance before its first imported entry.
+    """
+    s = Statement.__table__
+    account_id, end, stated = conn.execute(
+        select(s.c.account_id, s.c.end_date, s.c.balance)
+        .where(s.c.id == statement_id)).one()
+    return stated - balance(conn, account_id, end)
@@ -2,10 +2,6 @@ import os
 import sys
 import click
 
-import sqlalchemy
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-
 CONTEXT_SETTINGS = dict(auto_envvar_prefix='MYFI')
 
 
@@ -14,6 +10,36 @@ class Context:
     def __init__(self):
         self.verbose = False
         self.home = os.getcwd()
+        self.database = 'test.db'
+        self.echo = False
+        self.new = False
+        self._dbengine = None
+        self._session = None
+
+    @property
+    def dbengine(self):
+        """The database engine, made by connect() on first use."""
+        return self.connect()
+
+    def connect(self):
+        """Create the database engine (and with --new, the tables) if that
+        has not been done yet, and return it."""
+        if self._dbengine is None:
+            from sqlalchemy import create_engine
+            self._dbengine = create_engine(
+                'sqlite:///{}'.format(self.database), echo=self.echo)
+            if self.new:
+                from myfi.models import Base
+                Base.metadata.create_all(self._dbengine)
+        return self._dbengine
+
+    @property
+    def session(self):
+        """An ORM session on dbengine, created on first use."""
+        if self._session is None:
+            from sqlalchemy.orm import sessionmaker
+            self._session = sessionmaker(bind=self.dbengine)()
+        return self._session
 
     def log(self, msg, *args, **kw):
         """Logs a message to stderr."""
@@ -35,25 +61,36 @@ cmd_folder = os.path.abspath(os.path.join(os.path.dirname(__file__),
 
 
 class ComplexCLI(click.MultiCommand):
+    """Commands are the cmd_*.py modules in cmd_folder.
+
+    The folder is listed once per process and a command's module is only
+    imported when that command (or the help listing) needs it.
+    """
+
+    _names = None
+    _commands = {}
 
     def list_commands(self, ctx):
-        rv = []
-        for filename in os.listdir(cmd_folder):
-            if filename.endswith('.py') and \
-               filename.startswith('cmd_'):
-                rv.append(filename[4:-3])
-        rv.sort()
-        return rv
+        if ComplexCLI._names is None:
+            ComplexCLI._names = sorted(
+                filename[4:-3] for filename in os.listdir(cmd_folder)
+                if filename.endswith('.py') and filename.startswith('cmd_'))
+        return ComplexCLI._names
 
     def get_command(self, ctx, name):
-        try:
-            if sys.version_info[0] == 2:
-                name = name.encode('ascii', 'replace')
-            mod = __import__('myfi.commands.cmd_' + name,
-                             None, None, ['cli'])
-        except ImportError:
-            return
-        return mod.cli
+        cmd = self._commands.get(name)
+        if cmd is None:
+            if name not in self.list_commands(ctx):
+                return
+            try:
+                if sys.version_info[0] == 2:
+                    name = name.encode('ascii', 'replace')
+                mod = __import__('myfi.commands.cmd_' + name,
+                                 None, None, ['cli'])
+            except ImportError:
+                return
+            cmd = self._commands[name] = mod.cli
+        return cmd
 
 
 @click.command(cls=ComplexCLI, context_settings=CONTEXT_SETTINGS)
@@ -68,14 +105,9 @@ class ComplexCLI(click.MultiCommand):
 @pass_context
 def cli(ctx, verbose, database, new, echo):
     ctx.verbose = verbose
-
-    ctx.dbengine = create_engine(
-        'sqlite:///{}'.format(database), echo=echo)
-
+    # the engine and session are made on first use, see Context
+    ctx.database = database
+    ctx.echo = echo
+    ctx.new = new
     if new:
-        from myfi.models import Base
-        Base.metadata.create_all(ctx.dbengine)
-
-    Session = sessionmaker(bind=ctx.dbengine)
-    session = Session()
-    ctx.session = session
+        ctx.connect()  # creates the tables now, whatever the command
@@ -4,8 +4,22 @@ from myfi.cli import pass_context
 
 @click.command('loadofx', short_help='Import OFX files.')
 @click.argument('ofxfile', nargs=-1)
+@click.option('--jobs', '-j', type=int, default=None,
+              help='parser processes (default: one per CPU)')
+@click.option('--batch', default=100,
+              help='files per database transaction')
+@click.option('--stream', is_flag=True,
+              help='read each file as it is imported, for very large files')
 @pass_context
-def cli(ctx, ofxfile):
+def cli(ctx, ofxfile, jobs, batch, stream):
     """Import OFX files."""
-    from myfi.loadofx import loadofx
-    loadofx(ctx.session, ofxfile)
+    from myfi.loadofx import bulkload, loadstream
+    if stream:
+        count = loadstream(ctx.session, ofxfile)
+        ctx.log('imported {} entries from {} files', count, len(ofxfile))
+        return
+    stats = bulkload(ctx.dbengine, ofxfile, jobs, batch)
+    ctx.log('imported {entries} entries from {files} files'
+            ' ({skipped} already present)', **stats)
+    ctx.vlog('parse {parse:.3f}s  insert {insert:.3f}s  commit {commit:.3f}s',
+             **stats)
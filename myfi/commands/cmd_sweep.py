@@ -0,0 +1,50 @@
+import click
+from myfi.cli import pass_context
+
+import datetime
+import importlib
+
+
+def parse_param(text):
+    """name=v1,v2,... -> (name, [values]); dates are YYYY-MM-DD."""
+    name, sep, values = text.partition('=')
+    if not sep or not name:
+        raise click.BadParameter('expected name=value[,value...]: ' + text)
+    l = []
+    for v in values.split(','):
+        try:
+            v = datetime.datetime.strptime(v, '%Y-%m-%d').date()
+        except ValueError:
+            pass
+        l.append(v)
+    return name, l
+
+
+@click.command('sweep', short_help='Simulate a plan over a parameter grid.')
+@click.option('--param', '-p', 'params', multiple=True, metavar='NAME=V1,V2',
+              help='parameter values to sweep (repeatable)')
+@click.option('--scenario', default='scenario:household', metavar='MOD:FUNC',
+              help='scenario function building each point')
+@click.option('--accounts', default='accounts.csv',
+              help='chart of accounts')
+@click.option('--years', default=5, help='years to simulate')
+@click.option('--workers', '-j', type=int, default=None,
+              help='worker processes (default: one per CPU)')
+@click.option('--show', '-s', 'show', multiple=True,
+              default=['emergency fund', 'midterm fund', 'Roth IRA'],
+              help='account balances to report (repeatable)')
+@pass_context
+def cli(ctx, params, scenario, accounts, years, workers, show):
+    """Run a scenario for every combination of the swept parameters and
+    print a table of milestone dates and end balances."""
+    from sweep import grid, sweep, table
+
+    modname, _, funcname = scenario.partition(':')
+    build = getattr(importlib.import_module(modname), funcname)
+    values = dict(parse_param(p) for p in params)
+    points = grid(**values)
+    ctx.vlog('running {} points', len(points))
+    results = sweep(build, points, workers,
+                    fixed=dict(accounts=accounts, years=years))
+    for line in table(results, list(show), list(values)):
+        click.echo(line)
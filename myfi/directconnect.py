@@ -0,0 +1,288 @@
+"""Download bank statements with OFX Direct Connect.
+
+    bank = Institution('bank', 'https://ofx.example.com/ofx', 'EXAMPLE',
+                       '1234', limit=2)
+    sources = [Source(bank, '324377516', '644930~1', 'CHECKING', user, pw),
+               ...]
+    errors = download(session, sources, datetime.date(2016, 1, 1))
+
+Every source's statement request is sent at once, at most limit at a
+time per institution.  Requests are POSTed over asyncio streams; each
+host keeps a few idle connections open for the next request to reuse.
+A request that fails to connect, times out, is cut off or gets a 5xx
+(or 429) response is retried after a delay that doubles every time.
+The statements that come back are imported with myfi.loadofx.load, as
+if they had been read from files; a response that is not a statement
+(an OFX error such as a failed signon) is reported as a StatementError
+for its source, and the others are still imported.
+"""
+import asyncio
+import datetime
+import io
+import itertools
+import re
+import ssl as _ssl
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+from myfi.ofxgen import HEADER, ofxdate
+
+Institution = namedtuple('Institution', 'name,url,org,fid,limit')
+Institution.__new__.__defaults__ = (2,)
+
+Source = namedtuple('Source', 'institution,bankid,acctid,accttype,user,password')
+
+_trnuid = itertools.count(1)
+
+
+class DownloadError(Exception):
+    """An OFX server answered with an HTTP error."""
+
+    def __init__(self, status, reason, body=b''):
+        Exception.__init__(self, '{} {}'.format(status, reason))
+        self.status = status
+        self.body = body
+
+    @property
+    def retry(self):
+        return self.status >= 500 or self.status == 429
+
+
+class StatementError(Exception):
+    """A response that is not a statement, e.g. an OFX signon error."""
+
+    def __init__(self, message, code=None, body=b''):
+        Exception.__init__(self, message)
+        self.code = code
+        self.body = body
+
+
+def _ofx_error(body, exc):
+    """a StatementError for a response body that could not be read"""
+    text = body.decode('latin-1')
+    for m in re.finditer(r'<CODE>\s*(\d+)', text):
+        code = int(m.group(1))
+        if code:
+            msg = re.search(r'<MESSAGE>([^<\r\n]*)', text[m.end():])
+            return StatementError('OFX error {}{}'.format(
+                code, ': ' + msg.group(1).strip() if msg else ''), code, body)
+    return StatementError('unreadable statement: {!r}'.format(exc), None, body)
+
+
+def statement_request(source, start, end=None, now=None):
+    """An OFX 1.02 bank statement request for source, as text."""
+    inst = source.institution
+    now = now or datetime.datetime.now()
+    end = end or now.date()
+    return ''.join([
+        HEADER, '<OFX>\n',
+        '<SIGNONMSGSRQV1><SONRQ><DTCLIENT>{}<USERID>{}<USERPASS>{}'
+        '<LANGUAGE>ENG<FI><ORG>{}<FID>{}</FI><APPID>QWIN<APPVER>2700'
+        '</SONRQ></SIGNONMSGSRQV1>\n'.format(
+            now.strftime('%Y%m%d%H%M%S'), source.user, source.password,
+            inst.org, inst.fid),
+        '<BANKMSGSRQV1><STMTTRNRQ><TRNUID>{}<STMTRQ>\n'.format(next(_trnuid)),
+        '<BANKACCTFROM><BANKID>{}<ACCTID>{}<ACCTTYPE>{}</BANKACCTFROM>\n'.format(
+            source.bankid, source.acctid, source.accttype),
+        '<INCTRAN><DTSTART>{}<DTEND>{}<INCLUDE>Y</INCTRAN>\n'.format(
+            ofxdate(start), ofxdate(end)),
+        '</STMTRQ></STMTTRNRQ></BANKMSGSRQV1></OFX>\n',
+    ])
+
+
+class ConnectionPool:
+    """Idle keep-alive connections, up to size per (host, port, tls)."""
+
+    def __init__(self, size=4):
+        self.size = size
+        self.idle = {}
+        self.opened = 0
+
+    async def acquire(self, host, port, tls):
+        idle = self.idle.get((host, port, tls))
+        while idle:
+            reader, writer = idle.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer
+            writer.close()
+        context = _ssl.create_default_context() if tls else None
+        conn = await asyncio.open_connection(host, port, ssl=context)
+        self.opened += 1
+        return conn
+
+    def release(self, host, port, tls, conn):
+        idle = self.idle.setdefault((host, port, tls), [])
+        if len(idle) < self.size:
+            idle.append(conn)
+        else:
+            conn[1].close()
+
+    async def close(self):
+        idle, self.idle = self.idle, {}
+        for conns in idle.values():
+            for reader, writer in conns:
+                writer.close()
+                try:
+                    await writer.wait_closed()
+                except OSError:
+                    pass
+
+
+async def _read_response(reader):
+    """(status, reason, headers, body) of one HTTP/1.1 response"""
+    line = await reader.readline()
+    if not line:
+        raise ConnectionResetError('connection closed before a response')
+    version, status, reason = (line.decode('latin-1').rstrip('\r\n')
+                               .split(' ', 2) + [''])[:3]
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n'):
+            break
+        if not line:
+            raise asyncio.IncompleteReadError(b'', None)
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                await reader.readline()
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        body = b''.join(chunks)
+    elif 'content-length' in headers:
+        body = await reader.readexactly(int(headers['content-length']))
+    else:
+        body = await reader.read()
+        headers['connection'] = 'close'
+    if version == 'HTTP/1.0' and \
+            headers.get('connection', '').lower() != 'keep-alive':
+        headers['connection'] = 'close'
+    return int(status), reason, headers, body
+
+
+class Fetcher:
+    """Statement downloads sharing one connection pool.
+
+    retries is how many times a failed request is tried again, after
+    backoff seconds, then twice that, and so on; timeout bounds each
+    attempt.
+    """
+
+    def __init__(self, retries=3, backoff=0.5, timeout=60.0, pool=None):
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.pool = pool or ConnectionPool()
+        self.limits = {}
+
+    def _limit(self, inst):
+        sem = self.limits.get(inst.name)
+        if sem is None:
+            sem = self.limits[inst.name] = asyncio.Semaphore(inst.limit)
+        return sem
+
+    async def post(self, url, body):
+        """POST an OFX request to url and return the response body."""
+        u = urlsplit(url)
+        tls = u.scheme == 'https'
+        host, port = u.hostname, u.port or (443 if tls else 80)
+        path = u.path or '/'
+        if u.query:
+            path += '?' + u.query
+        data = body.encode('ascii')
+        request = ('POST {} HTTP/1.1\r\nHost: {}\r\n'
+                   'Content-Type: application/x-ofx\r\n'
+                   'Accept: application/ofx, application/x-ofx\r\n'
+                   'Content-Length: {}\r\nConnection: keep-alive\r\n\r\n'
+                   .format(path, u.netloc, len(data))).encode('ascii') + data
+
+        # timeout bounds the whole attempt: connecting, sending, reading
+        return await asyncio.wait_for(
+            self._exchange(host, port, tls, request), self.timeout)
+
+    async def _exchange(self, host, port, tls, request):
+        reader, writer = await self.pool.acquire(host, port, tls)
+        try:
+            writer.write(request)
+            await writer.drain()
+            status, reason, headers, content = await _read_response(reader)
+        except BaseException:
+            writer.close()
+            raise
+        if headers.get('connection', '').lower() == 'close':
+            writer.close()
+        else:
+            self.pool.release(host, port, tls, (reader, writer))
+        if status >= 400:
+            raise DownloadError(status, reason, content)
+        return content
+
+    async def fetch(self, source, start, end=None):
+        """The OFX statement of one source, as bytes."""
+        inst = source.institution
+        async with self._limit(inst):
+            attempt = 0
+            while True:
+                try:
+                    return await self.post(
+                        inst.url, statement_request(source, start, end))
+                except DownloadError as e:
+                    if not e.retry or attempt >= self.retries:
+                        raise
+                except (OSError, asyncio.TimeoutError,
+                        asyncio.IncompleteReadError):
+                    if attempt >= self.retries:
+                        raise
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+                attempt += 1
+
+    async def fetch_all(self, sources, start, end=None):
+        """Every source's statement, in order; a source that could not be
+        downloaded has the exception instead."""
+        return await asyncio.gather(
+            *[self.fetch(s, start, end) for s in sources],
+            return_exceptions=True)
+
+    async def close(self):
+        await self.pool.close()
+
+
+async def fetch_all(sources, start, end=None, **kw):
+    """Download every source's statement with a new Fetcher."""
+    fetcher = Fetcher(**kw)
+    try:
+        return await fetcher.fetch_all(sources, start, end)
+    finally:
+        await fetcher.close()
+
+
+def load_responses(session, responses):
+    """Import the downloaded statements; (index, exception) for the
+    responses that could not be downloaded or read."""
+    from myfi.loadofx import load, read
+    failed = []
+    parsed = []
+    for i, r in enumerate(responses):
+        if not isinstance(r, BaseException):
+            try:
+                parsed.append(read(io.BytesIO(r)))
+                continue
+            except Exception as e:
+                r = _ofx_error(r, e)
+        failed.append((i, r))
+    load(session, parsed)
+    return failed
+
+
+def download(session, sources, start, end=None, **kw):
+    """Download and import the statements of sources from start through
+    end; returns (source, exception) for those that failed."""
+    sources = list(sources)
+    responses = asyncio.run(fetch_all(sources, start, end, **kw))
+    return [(sources[i], e) for i, e in load_responses(session, responses)]
@@ -3,57 +3,300 @@ import click
 from ofxparse import OfxParser
 
 import datetime
+import time
+from concurrent.futures import ProcessPoolExecutor
 from decimal import Decimal
+from itertools import islice
 
+from sqlalchemy import select
+
+from myfi.balances import refresh, refresh_entries
 from myfi.models import Account, Entry, Statement
 
 ZERO = Decimal('0.00')
 
 
+def payee(tran):
+    """Split an OFX transaction's payee and memo into (name, memo)."""
+    if tran.memo.startswith(tran.payee):
+        return tran.memo.lower(), None
+    elif tran.memo:
+        if not tran.id.endswith("INT"):
+            print('{}|{}|{}'.format(tran.id, tran.payee, tran.memo))
+        return tran.payee.lower(), tran.memo.lower()
+    else:
+        return None, tran.payee.lower()
+
+
+def parse(fname):
+    """Parse one OFX file into plain account, statement and entry rows.
+
+    The rows are dicts of column values, so they can be sent back from a
+    worker process and handed straight to an executemany.
+    """
+    with open(fname, 'rb') as fi:
+        return read(fi)
+
+
+def read(fi):
+    """Parse OFX from an open binary file, as parse() does."""
+    o = OfxParser.parse(fi)
+    a = o.account
+    account = dict(rtn=a.routing_number, number=a.number, accttype=a.type)
+
+    st = a.statement
+    statement = dict(
+        balance=st.balance,
+        avail_balance=st.available_balance,
+        start_date=st.start_date and st.start_date.date(),
+        end_date=st.end_date and st.end_date.date(),
+    )
+
+    entries = []
+    for tran in st.transactions:
+        name, memo = payee(tran)
+        entries.append(dict(
+            dtposted=tran.date.date(),
+            fitid=tran.id,
+            trntype=tran.type.lower(),
+            checkno=tran.checknum or None,
+            amount=Decimal(tran.amount).quantize(ZERO),
+            name=name,
+            memo=memo,
+        ))
+    return account, statement, entries
+
+
+class ImportCache:
+    """Ids already resolved during one import run.
+
+    Accounts are looked up by (rtn, number, accttype) and statements by
+    (account, start, end) once per run; fitids are remembered per account
+    so overlapping statements only query the database for ones not seen
+    yet.  Ids resolved in a transaction that is rolled back may not exist
+    any more, so the loaders clear() the cache when that happens.
+    """
+
+    def __init__(self):
+        self.accounts = {}
+        self.statements = {}
+        self.fitids = {}
+
+    def clear(self):
+        self.accounts.clear()
+        self.statements.clear()
+        self.fitids.clear()
+
+    def account(self, conn, row):
+        key = (row['rtn'], row['number'], row['accttype'])
+        account_id = self.accounts.get(key)
+        if account_id is None:
+            t = Account.__table__
+            account_id = conn.execute(select(t.c.id).where(
+                t.c.rtn == row['rtn'], t.c.number == row['number'],
+                t.c.accttype == row['accttype'])).scalar()
+            if account_id is None:
+                account_id = conn.execute(
+                    t.insert(), row).inserted_primary_key[0]
+            self.accounts[key] = account_id
+        return account_id
+
+    def statement(self, conn, account_id, row):
+        key = (account_id, row['start_date'], row['end_date'])
+        statement_id = self.statements.get(key)
+        if statement_id is None:
+            t = Statement.__table__
+            statement_id = conn.execute(select(t.c.id).where(
+                t.c.account_id == account_id,
+                t.c.start_date == row['start_date'],
+                t.c.end_date == row['end_date'])).scalar()
+            if statement_id is None:
+                statement_id = conn.execute(
+                    t.insert(),
+                    dict(row, account_id=account_id)).inserted_primary_key[0]
+            self.statements[key] = statement_id
+        return statement_id
+
+    def new_entries(self, conn, account_id, rows):
+        """The rows whose fitid is in neither the database nor this run."""
+        seen = self.fitids.setdefault(account_id, set())
+        wanted = list({r['fitid'] for r in rows} - seen)
+        t = Entry.__table__
+        for i in range(0, len(wanted), 500):
+            seen.update(conn.execute(select(t.c.fitid).where(
+                t.c.account_id == account_id,
+                t.c.fitid.in_(wanted[i:i + 500]))).scalars())
+        fresh = []
+        for r in rows:
+            if r['fitid'] not in seen:
+                seen.add(r['fitid'])
+                fresh.append(r)
+        return fresh
+
+
+def resolve(conn, cache, arow, srow, erows):
+    """Find or create the account and statement of a parsed file and
+    return its entry rows that still need inserting, ids filled in."""
+    account_id = cache.account(conn, arow)
+    statement_id = cache.statement(conn, account_id, srow)
+    rows = cache.new_entries(conn, account_id, erows)
+    for row in rows:
+        row['account_id'] = account_id
+        row['statement_id'] = statement_id
+    return rows
+
+
 def loadofx(session, src):
     """Import OFX files into the database.
+
+    Accounts, statements and entries (by fitid) that are already there
+    are reused or skipped, so overlapping statements can be re-imported.
+    The daily balances of the accounts are brought up to date from the
+    earliest new entry on.
+    """
+    load(session, map(parse, src))
+
+
+def load(session, parsed, cache=None):
+    """Import parsed (account, statement, entries) rows as loadofx does,
+    committing after each statement.
+
+    A retry of a failed import can pass the same ImportCache as cache.
     """
+    if cache is None:
+        cache = ImportCache()
+    for arow, srow, erows in parsed:
+        try:
+            rows = resolve(session, cache, arow, srow, erows)
+            if rows:
+                session.execute(Entry.__table__.insert(), rows)
+                refresh_entries(session, rows)
+            session.commit()
+        except BaseException:
+            session.rollback()
+            cache.clear()
+            raise
+
+
+def loadstream(session, src, batch=1000, cache=None):
+    """Import OFX files while reading them, batch entries at a time.
+
+    Like loadofx, but each file is read with myfi.ofxstream, so entries
+    are inserted as the file is read and a file of any size takes the
+    same memory (less the fitids remembered for skipping duplicates).
+    The statement's balances, which follow its transactions in the file,
+    are stored when it ends.  Returns the number of new entries.
+    A retry of a failed import can pass the same ImportCache as cache.
+    """
+    if cache is None:
+        cache = ImportCache()
+    count = 0
     for fname in src:
-        with open(fname, 'rb') as fi:
-            o = OfxParser.parse(fi)
-        a = o.account
-        account = Account(rtn=a.routing_number,
-                          number=a.number, accttype=a.type)
-        # TODO: look up the account
-
-        st = a.statement
-        statement = Statement(
-            account=account,
-            balance=st.balance,
-            avail_balance=st.available_balance,
-            start_date=st.start_date,
-            end_date=st.end_date,
-        )
-
-        for tran in st.transactions:
-            if tran.memo.startswith(tran.payee):
-                name = tran.memo.lower()
-                memo = None
-            elif tran.memo:
-                if tran.id.endswith("INT"):
-                    name = tran.payee.lower()
-                    memo = tran.memo.lower()
-                else:
-                    print('{}|{}|{}'.format(tran.id, tran.payee, tran.memo))
-            else:
-                memo = tran.payee.lower()
-                name = None
-            entry = Entry(
-                account=account,
-                statement=statement,
-                dtposted=tran.date.date(),
-                fitid=tran.id,
-                trntype=tran.type.lower(),
-                checkno=tran.checknum,
-                amount=Decimal(tran.amount).quantize(ZERO),
-                name=name,
-                memo=memo,
-            )
-
-        session.add(account)
-        session.commit()
+        try:
+            count += _loadfile(session, cache, fname, batch)
+            session.commit()
+        except BaseException:
+            session.rollback()
+            cache.clear()
+            raise
+    return count
+
+
+def _loadfile(session, cache, fname, batch):
+    from myfi.ofxstream import stream
+    t = Statement.__table__
+    count = 0
+    since = {}
+    with open(fname, 'rb') as fi:
+        rows = []
+        current = ids = None
+        for arow, srow, erow in stream(fi):
+            if srow is not current:
+                account_id = cache.account(session, arow)
+                ids = account_id, cache.statement(session, account_id, srow)
+                current = srow
+            if erow is not None:
+                rows.append(erow)
+                if len(rows) < batch:
+                    continue
+            count += _insert(session, cache, ids, rows, since)
+            rows = []
+            if erow is None:
+                session.execute(t.update().where(t.c.id == ids[1]).values(
+                    balance=srow['balance'],
+                    avail_balance=srow['avail_balance']))
+    for account_id, day in since.items():
+        refresh(session, account_id, day)
+    return count
+
+
+def _insert(conn, cache, ids, rows, since):
+    account_id, statement_id = ids
+    rows = cache.new_entries(conn, account_id, rows)
+    for row in rows:
+        row['account_id'] = account_id
+        row['statement_id'] = statement_id
+        day = row['dtposted']
+        if account_id not in since or day < since[account_id]:
+            since[account_id] = day
+    if rows:
+        conn.execute(Entry.__table__.insert(), rows)
+    return len(rows)
+
+
+def bulkload(engine, src, workers=None, batch=100, cache=None):
+    """Import OFX files, parsing in worker processes and inserting with
+    executemany, one transaction per batch of files.
+
+    Like loadofx, only rows that are not in the database yet are added.
+    Returns the seconds spent waiting on the parsers, inserting and
+    committing, and the number of files, new entries and skipped entries.
+    A retry of a failed import can pass the same ImportCache as cache.
+    """
+    src = list(src)
+    stats = dict(parse=0.0, insert=0.0, commit=0.0, files=0, entries=0,
+                 skipped=0)
+    if cache is None:
+        cache = ImportCache()
+
+    pool = None
+    if workers == 1 or len(src) < 2:
+        results = map(parse, src)
+    else:
+        pool = ProcessPoolExecutor(workers)
+        results = pool.map(parse, src, chunksize=max(1, len(src) // 64))
+    try:
+        while True:
+            t0 = time.perf_counter()
+            chunk = list(islice(results, batch))
+            t1 = time.perf_counter()
+            stats['parse'] += t1 - t0
+            if not chunk:
+                break
+
+            with engine.connect() as conn:
+                try:
+                    rows = []
+                    for arow, srow, erows in chunk:
+                        new = resolve(conn, cache, arow, srow, erows)
+                        stats['skipped'] += len(erows) - len(new)
+                        rows.extend(new)
+                    if rows:
+                        conn.execute(Entry.__table__.insert(), rows)
+                        refresh_entries(conn, rows)
+                    t2 = time.perf_counter()
+                    conn.commit()
+                    t3 = time.perf_counter()
+                except BaseException:
+                    conn.rollback()
+                    cache.clear()
+                    raise
+
+            stats['insert'] += t2 - t1
+            stats['commit'] += t3 - t2
+            stats['files'] += len(chunk)
+            stats['entries'] += len(rows)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return stats
@@ -1,6 +1,6 @@
 
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.types import DECIMAL
 Base = declarative_base()
@@ -10,6 +10,9 @@ Money = DECIMAL(precision=8, scale=2)
 
 class Account(Base):
     __tablename__ = 'accounts'
+    __table_args__ = (
+        Index('ix_accounts_key', 'rtn', 'number', 'accttype', unique=True),
+    )
 
     id = Column(Integer, primary_key=True)
     name = Column(String)
@@ -38,6 +41,10 @@ Account.statements = relationship(
 
 class Entry(Base):
     __tablename__ = 'entries'
+    __table_args__ = (
+        Index('ix_entries_fitid', 'account_id', 'fitid', unique=True),
+        Index('ix_entries_posted', 'account_id', 'dtposted'),
+    )
 
     id = Column(Integer, primary_key=True)
     statement_id = Column(Integer, ForeignKey("statements.id"))
@@ -59,6 +66,17 @@ Account.entries = relationship(
     'Entry', order_by=Entry.fitid, back_populates="account")
 
 
+class DailyBalance(Base):
+    """Net activity and running balance of an account, one row per day
+    with entries.  Kept up to date by the OFX import (myfi.balances)."""
+    __tablename__ = 'daily_balances'
+
+    account_id = Column(Integer, ForeignKey("accounts.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    amount = Column(Money)
+    balance = Column(Money)
+
+
 class Transaction(Base):
     __tablename__ = 'transactions'
 
@@ -0,0 +1,87 @@
+"""Write OFX 1.02 (SGML) bank statements.
+
+Used to make synthetic statement files for tests and benchmarks, and as
+the response body of a stand-in OFX server.
+"""
+import datetime
+import random
+from collections import namedtuple
+from decimal import Decimal
+
+StmtTrn = namedtuple('StmtTrn', 'trntype,dtposted,amount,fitid,name,memo')
+
+HEADER = """OFXHEADER:100
+DATA:OFXSGML
+VERSION:102
+SECURITY:NONE
+ENCODING:USASCII
+CHARSET:1252
+COMPRESSION:NONE
+OLDFILEUID:NONE
+NEWFILEUID:NONE
+
+"""
+
+
+def ofxdate(d):
+    return d.strftime('%Y%m%d')
+
+
+def statement(bankid, acctid, transactions, balance,
+              start=None, end=None, accttype='CHECKING'):
+    """An OFX statement response for one bank account, as text."""
+    if start is None:
+        start = min(t.dtposted for t in transactions)
+    if end is None:
+        end = max(t.dtposted for t in transactions)
+    out = [HEADER, '<OFX>\n',
+           '<SIGNONMSGSRSV1><SONRS><STATUS><CODE>0<SEVERITY>INFO</STATUS>'
+           '<DTSERVER>{}<LANGUAGE>ENG</SONRS></SIGNONMSGSRSV1>\n'.format(
+               ofxdate(end)),
+           '<BANKMSGSRSV1><STMTTRNRS><TRNUID>1'
+           '<STATUS><CODE>0<SEVERITY>INFO</STATUS>\n',
+           '<STMTRS><CURDEF>USD\n',
+           '<BANKACCTFROM><BANKID>{}<ACCTID>{}<ACCTTYPE>{}</BANKACCTFROM>\n'.format(
+               bankid, acctid, accttype),
+           '<BANKTRANLIST><DTSTART>{}<DTEND>{}\n'.format(
+               ofxdate(start), ofxdate(end))]
+    for t in transactions:
+        out.append('<STMTTRN><TRNTYPE>{}<DTPOSTED>{}<TRNAMT>{}<FITID>{}'
+                   '<NAME>{}'.format(t.trntype, ofxdate(t.dtposted),
+                                     t.amount, t.fitid, t.name))
+        if t.memo:
+            out.append('<MEMO>{}'.format(t.memo))
+        out.append('</STMTTRN>\n')
+    out.append('</BANKTRANLIST>\n')
+    out.append('<LEDGERBAL><BALAMT>{}<DTASOF>{}</LEDGERBAL>\n'.format(
+        balance, ofxdate(end)))
+    out.append('<AVAILBAL><BALAMT>{}<DTASOF>{}</AVAILBAL>\n'.format(
+        balance, ofxdate(end)))
+    out.append('</STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n')
+    return ''.join(out)
+
+
+PAYEES = ['RIDLEYS', 'SHELL OIL', 'CITY UTILITIES', 'SMITHS FOOD',
+          'AMAZON MKTPLACE', 'PAYROLL']
+
+
+def synthetic(count, start=datetime.date(2016, 1, 1), seed=0, prefix=''):
+    """count made-up transactions, about three a day from start.
+
+    fitids are the posting date plus a sequence number, so statements
+    generated for overlapping ranges with the same seed overlap exactly.
+    """
+    rng = random.Random(seed)
+    l = []
+    for n in range(count):
+        day = start + datetime.timedelta(n // 3)
+        name = rng.choice(PAYEES)
+        cents = rng.randrange(100, 20000)
+        if name == 'PAYROLL':
+            trntype, amount = 'CREDIT', Decimal(cents * 5).scaleb(-2)
+        else:
+            trntype, amount = 'DEBIT', -Decimal(cents).scaleb(-2)
+        l.append(StmtTrn(trntype, day, amount,
+                         '{}{}{:02}'.format(prefix, ofxdate(day), n % 3),
+                         name, '{} #{}'.format(name, n)))
+    return l
@@ -0,0 +1,169 @@
+"""Read OFX statements a transaction at a time.
+
+    with open(fname, 'rb') as fi:
+        for account, statement, entry in stream(fi):
+            ...
+
+OfxParser.parse reads a whole file into an object tree first; stream()
+reads fixed-size chunks and yields each STMTTRN as soon as its closing
+tag has been read, so memory stays the same however long the file is.
+Both OFX 1.x (SGML, leaf elements not closed) and 2.x (XML) files are
+read; the header says which encoding to decode with.
+
+Each entry is a row for the entries table, as myfi.loadofx.parse makes
+them.  account and statement are dicts of accounts and statements
+columns, the same objects for every entry of one statement.  The
+statement's balances come after its transactions in the file: they are
+filled in by the time stream() yields (account, statement, None) at the
+end of each statement.
+"""
+import codecs
+import datetime
+import html
+import re
+from collections import namedtuple
+from decimal import Decimal
+
+from myfi.loadofx import payee
+
+ZERO = Decimal('0.00')
+
+# ofxparse's AccountType
+ACCTTYPES = dict(BANKACCTFROM=1, CCACCTFROM=2, INVACCTFROM=3)
+# aggregates whose fields we read
+AGGREGATES = {'STMTTRN', 'LEDGERBAL', 'AVAILBAL'} | set(ACCTTYPES)
+STATEMENTS = {'STMTRS', 'CCSTMTRS', 'INVSTMTRS'}
+DATES = dict(DTSTART='start_date', DTEND='end_date')
+
+# a tag and the text after it, up to the next tag
+TOKEN = re.compile(r'<([^<>]*)>([^<]*)')
+# the time zone and fraction of a second of a datetime, as ofxparse
+# matches them
+TZ = re.compile(r'\[([-+]?\d+\.?\d*):\w*\]$')
+FRACTION = re.compile(r'[0-9]*\.([0-9]{0,5})')
+
+Tran = namedtuple('Tran', 'id,payee,memo')
+
+
+def _encoding(head):
+    """the codec for a file starting with head (bytes)"""
+    text = head.decode('latin-1')
+    m = re.search(r'<\?xml[^>]*encoding=["\']([-\w]+)', text)
+    if m:
+        return m.group(1)
+    if '<?xml' in text or re.search(r'^ENCODING:\s*UTF-8', text, re.M):
+        return 'utf-8'
+    m = re.search(r'^CHARSET:\s*(\d+)', text, re.M)
+    if m:
+        return 'cp' + m.group(1)
+    return 'cp1252'
+
+
+def tokens(fi, size=1 << 16):
+    """(tag, text) for every tag in the file fi (binary), text stripped
+
+    The SGML header before the first tag is skipped, as are XML
+    processing instructions and comments.
+    """
+    chunk = fi.read(size)
+    decoder = codecs.getincrementaldecoder(_encoding(chunk))('replace')
+    buf = decoder.decode(chunk)
+    i = buf.find('<')
+    buf = buf[i:] if i >= 0 else ''
+    findall = TOKEN.findall
+    while True:
+        chunk = fi.read(size)
+        eof = not chunk
+        buf += decoder.decode(chunk, final=eof)
+        # the text after the last tag may go on in the next chunk
+        cut = len(buf) if eof else buf.rfind('<')
+        if cut > 0:
+            for tag, text in findall(buf, 0, cut):
+                if tag[:1] not in '?!':
+                    yield tag.strip(), text.strip()
+            buf = buf[cut:]
+        if eof:
+            return
+
+
+def _date(value):
+    """the date of an OFX datetime, e.g. 20160107120000.000[-5:EST]
+
+    As ofxparse reads it: the local time less the time zone's offset,
+    plus any fraction of a second.
+    """
+    day = datetime.date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+    tz = TZ.search(value) if '[' in value else None
+    if tz is None and '.' not in value:
+        return day
+    when = datetime.datetime(day.year, day.month, day.day)
+    clock = value[8:14]
+    if len(clock) == 6 and clock.isdigit():
+        when += datetime.timedelta(hours=int(clock[:2]),
+                                   minutes=int(clock[2:4]),
+                                   seconds=int(clock[4:]))
+    if tz is not None:
+        when -= datetime.timedelta(hours=float(tz.group(1)))
+    m = FRACTION.match(value)
+    if m:
+        when += datetime.timedelta(seconds=float('0.' + m.group(1)))
+    return when.date()
+
+
+def _amount(value):
+    return Decimal(value.replace(',', '.'))
+
+
+def _entry(fields):
+    get = fields.get
+    name, memo = payee(Tran(get('FITID', ''), get('NAME', ''),
+                            get('MEMO', '')))
+    return dict(
+        dtposted=_date(fields['DTPOSTED']),
+        fitid=get('FITID'),
+        trntype=get('TRNTYPE', '').lower(),
+        checkno=get('CHECKNUM') or None,
+        amount=_amount(fields['TRNAMT']).quantize(ZERO),
+        name=name,
+        memo=memo,
+    )
+
+
+def stream(fi, size=1 << 16):
+    """(account, statement, entry) for each transaction in fi, then
+    (account, statement, None) at the end of each statement"""
+    account = statement = None
+    where = None
+    fields = {}
+    for tag, text in tokens(fi, size):
+        if text and where is not None and tag[:1] != '/':
+            # a field of the aggregate; '&' only ever starts an entity
+            fields[tag] = html.unescape(text) if '&' in text else text
+            continue
+        if tag[:1] == '/':
+            tag = tag[1:]
+            if tag == where:
+                if tag == 'STMTTRN':
+                    yield account, statement, _entry(fields)
+                elif tag in ACCTTYPES:
+                    account = dict(rtn=fields.get('BANKID', ''),
+                                   number=fields.get('ACCTID'),
+                                   accttype=ACCTTYPES[tag])
+                elif tag == 'LEDGERBAL':
+                    statement['balance'] = _amount(fields['BALAMT'])
+                elif tag == 'AVAILBAL':
+                    statement['avail_balance'] = _amount(fields['BALAMT'])
+                where = None
+            elif tag in STATEMENTS and statement is not None:
+                yield account, statement, None
+            continue
+
+        if tag in STATEMENTS:
+            statement = dict(balance=None, avail_balance=None,
+                             start_date=None, end_date=None)
+        elif tag in AGGREGATES:
+            where = tag
+            fields = {}
+        elif where is None and tag in DATES and text and statement is not None:
+            # the transaction list's range, before its first STMTTRN
+            statement[DATES[tag]] = _date(text)
@@ -0,0 +1,266 @@
+# -*- coding: utf8 -*-
+'''bulk balance projections for Recurring schedules
+
+Recurrences whose service() posts the same entries every time (PURE:
+paychecks, fixed mission payments) are compiled once into per-account
+deltas and laid out on a date axis with NumPy.  Savings interest is
+computed from those arrays when nothing else can touch the balances.
+Anything stateful (BCM rules, Tithing, ...) still goes through the
+DateSelect event loop; before each of those events the compiled activity
+due so far is posted to the ledger as one summarized transaction, so the
+rule sees the same balances it would have seen.
+'''
+
+from __future__ import print_function, unicode_literals, division, absolute_import
+
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+import numpy as np
+
+from simple import MICROS, DateSelect, Entry, Ledger, Recurring, Savings
+
+EPOCH = date(1970, 1, 1).toordinal()
+
+
+def _key(when):
+    '''sortable integer for a date or datetime, in seconds'''
+    secs = when.toordinal() * 86400
+    if hasattr(when, 'hour'):
+        secs += when.hour * 3600 + when.minute * 60 + when.second
+    return secs
+
+
+def signed(entry):
+    '''the change an entry makes to its account balance'''
+    if entry.debit == entry.account.DEBIT_BALANCE:
+        return entry.amount
+    return -entry.amount
+
+
+class _Scratch(Ledger):
+    '''a ledger that does not use up transaction ids'''
+    _nextid = int
+
+
+def compile_deltas(r, coa, money):
+    '''balance changes made by one service() of a PURE recurrence'''
+    scratch = _Scratch(coa, None, money)
+    r.service(scratch, date.today())
+    return {acct: bal for acct, bal in scratch.balances.items() if bal}
+
+
+class _Stream:
+    '''the expanded occurrences of a compiled recurrence'''
+
+    def __init__(self, r, deltas, until):
+        self.order = r.order
+        self.deltas = deltas
+        whens = []
+        try:
+            when = next(r)
+            while when <= until:
+                whens.append(when)
+                when = next(r)
+        except StopIteration:
+            pass
+        self.whens = whens
+        self.keys = [_key(w) for w in whens]
+        self.applied = 0
+
+    def due(self, key, order):
+        '''number of occurrences serviced before (key, order)'''
+        if self.order < order:
+            return bisect_right(self.keys, key)
+        return bisect_left(self.keys, key)
+
+
+class _Synced(Recurring):
+    '''a stateful recurrence, serviced after catching the ledger up'''
+
+    def __init__(self, inner, projector):
+        self.inner = inner
+        self.order = inner.order
+        self.projector = projector
+
+    def __next__(self):
+        return next(self.inner)
+
+    def service(self, ledger, when):
+        p = self.projector
+        p.sync(ledger, when, self.order)
+        tx = ledger.transactions
+        n = len(tx)
+        v = self.inner.service(ledger, when)
+        day = when.toordinal()
+        for i in range(n, len(tx)):
+            for e in tx[i].entries:
+                p.posted.append((day, e.account, signed(e)))
+        return v
+
+
+class Projection:
+    '''balance trajectories: one row per account, one column per day
+
+    balances[i, j] is the balance of accounts[i] at the end of dates[j].
+    '''
+
+    def __init__(self, dates, accounts, balances, opening):
+        self.dates = dates
+        self.accounts = accounts
+        self.balances = balances
+        self.opening = opening
+        self._rows = {acct: i for i, acct in enumerate(accounts)}
+
+    def trajectory(self, acct):
+        return self.balances[self._rows[acct]]
+
+    def balance(self, acct, when):
+        '''balance of acct at the end of the day when'''
+        j = np.searchsorted(self.dates, np.datetime64(
+            when.toordinal() - EPOCH, 'D'), side='right')
+        if j == 0:
+            return self.opening[self._rows[acct]]
+        return self.balances[self._rows[acct], j - 1]
+
+    def final(self):
+        return {acct: self.balances[i, -1] for i, acct in enumerate(self.accounts)}
+
+
+class Projector:
+
+    def __init__(self, ledger, recurring, until):
+        self.ledger = ledger
+        self.until = until
+        self.money = money = ledger.money
+        self.opening = dict(ledger.balances)
+        self.streams = []
+        self.savings = []
+        self.fallback = []
+        self.posted = []
+        for r in recurring:
+            if r.PURE:
+                deltas = compile_deltas(r, ledger.coa, money)
+                self.streams.append(_Stream(r, deltas, until))
+            elif type(r) is Savings:
+                self.savings.append(r)
+            else:
+                self.fallback.append(r)
+        if self.fallback:
+            self.fallback.extend(self.savings)
+            self.savings = []
+        self.interest = []
+
+    def sync(self, ledger, when, order):
+        '''post the compiled activity due before (when, order)'''
+        key = _key(when)
+        total = {}
+        for s in self.streams:
+            n = s.due(key, order)
+            k = n - s.applied
+            if k:
+                s.applied = n
+                for acct, v in s.deltas.items():
+                    total[acct] = total.get(acct, self.money.ZERO) + v * k
+        self._post(ledger, when, total)
+
+    def _post(self, ledger, when, total):
+        entries = []
+        for acct, v in sorted(total.items(), key=lambda item: item[0].number):
+            if v:
+                debit = (v > 0) == acct.DEBIT_BALANCE
+                entries.append(Entry(when, when, acct, debit, abs(v), None))
+        if entries:
+            ledger.enter(when, 'projected activity', *entries)
+
+    def accrue(self):
+        '''interest for Savings, when only compiled streams move balances'''
+        money = self.money
+        events = []
+        for s in self.savings:
+            try:
+                when = next(s)
+                while when <= self.until:
+                    events.append((_key(when), s.order, when, s))
+                    when = next(s)
+            except StopIteration:
+                pass
+        events.sort(key=lambda e: e[:2])
+        accrued = {}
+        for key, order, when, s in events:
+            intr = money.round(money.mul(s.pbal, s.rate))
+            if intr > 0:
+                for acct in (s.dest, s.src):
+                    accrued[acct] = accrued.get(acct, money.ZERO) + intr
+                self.interest.append((when.toordinal(), s.dest, intr))
+                self.interest.append((when.toordinal(), s.src, intr))
+            bal = self.opening.get(s.dest, money.ZERO)
+            bal += accrued.get(s.dest, money.ZERO)
+            for st in self.streams:
+                v = st.deltas.get(s.dest)
+                if v:
+                    bal += v * st.due(key, order)
+            s.pbal = bal
+        return accrued
+
+    def run(self):
+        ledger = self.ledger
+        accrued = {}
+        if self.fallback:
+            ds = DateSelect([_Synced(r, self) for r in self.fallback])
+            for v in ds.service_loop(ledger, self.until):
+                pass
+        elif self.savings:
+            accrued = self.accrue()
+        # whatever compiled activity is left, plus any accrued interest
+        total = dict(accrued)
+        for s in self.streams:
+            k = len(s.keys) - s.applied
+            if k:
+                s.applied = len(s.keys)
+                for acct, v in s.deltas.items():
+                    total[acct] = total.get(acct, self.money.ZERO) + v * k
+        self._post(ledger, self.until, total)
+        return self.trajectories()
+
+    def trajectories(self):
+        money = self.money
+        posted = self.posted + self.interest
+        stream_days = [np.array([w.toordinal() for w in s.whens], dtype=np.int64)
+                       for s in self.streams]
+        accounts = set(self.opening)
+        accounts.update(p[1] for p in posted)
+        for s in self.streams:
+            accounts.update(s.deltas)
+        accounts = sorted(accounts, key=lambda acct: acct.number)
+        rows = {acct: i for i, acct in enumerate(accounts)}
+
+        days = np.unique(np.concatenate(
+            [np.array([p[0] for p in posted], dtype=np.int64)] + stream_days))
+        dtype = np.int64 if money is MICROS else object
+        delta = np.full((len(accounts), len(days) + 1), money.ZERO, dtype=dtype)
+        for acct, bal in self.opening.items():
+            delta[rows[acct], 0] = bal
+        for s, sdays in zip(self.streams, stream_days):
+            cols = np.searchsorted(days, sdays) + 1
+            for acct, v in s.deltas.items():
+                np.add.at(delta[rows[acct]], cols, v)
+        if posted:
+            cols = np.searchsorted(days, [p[0] for p in posted]) + 1
+            idx = np.array([rows[p[1]] for p in posted], dtype=np.intp)
+            vals = np.array([p[2] for p in posted], dtype=dtype)
+            np.add.at(delta, (idx, cols), vals)
+        balances = np.cumsum(delta, axis=1)
+        dates = (days - EPOCH).astype('datetime64[D]')
+        return Projection(dates, accounts, balances[:, 1:], balances[:, 0])
+
+
+def project(ledger, recurring, until):
+    '''run recurring against ledger through until, in bulk where possible
+
+    The ledger ends up with the same balances a DateSelect.service_loop
+    would have left (compiled activity is posted as summarized
+    'projected activity' transactions), and the returned Projection has
+    the daily balance trajectory of every account touched.
+    '''
+    return Projector(ledger, recurring, until).run()
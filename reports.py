@@ -0,0 +1,245 @@
+# -*- coding: utf8 -*-
+'''reports streamed from a ledger into text, CSV or JSON lines
+
+    write(journal(ledger, start=date(2016, 1, 1), accounts=['cash']),
+          CSVSink(open('cash.csv', 'w', newline='')))
+    write(page(balances(ledger), 2, size=20), TextSink(sys.stdout))
+
+A Report is its field names, a generator of records and two ways to show
+a record: text() as the lines Ledger.show_* print, flatten() as rows of
+plain fields for CSV and JSON.  Nothing is read from the ledger until a
+sink writes the report, one record at a time; the sinks collect their
+output and write it to the file buffer lines at a time, so memory does
+not grow with the ledger.  Filters (start, end, accounts) are applied as
+the records are generated; page() takes one page of any report.
+'''
+
+from __future__ import print_function, unicode_literals, division, absolute_import
+
+import csv
+import json
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import islice
+
+from simple import Account, _SEQMASK, _postkey, dollars
+
+Report = namedtuple('Report', 'fields,records,flatten,text')
+
+JOURNAL = ('tid', 'date', 'memo', 'account', 'debit', 'credit', 'note')
+BALANCES = ('account', 'balance')
+REGISTER = ('date', 'tid', 'memo', 'debit', 'credit', 'balance')
+FORM = ('line', 'value')
+
+
+def _accounts(ledger, accounts):
+    '''accounts given by name, number or Account, as a list of Accounts'''
+    found = []
+    for a in accounts:
+        acct = a if isinstance(a, Account) else ledger.get_account(a)
+        if acct is None:
+            raise KeyError('no account {!r} in the chart of accounts'.format(a))
+        found.append(acct)
+    return found
+
+
+def _positions(ledger, accounts, start, end):
+    '''positions in ledger.transactions of those posting to accounts
+    from start through end, in order'''
+    lo = 0 if start is None else _postkey(start, 0)
+    hi = None if end is None else _postkey(end) + 1
+    seen = set()
+    for acct in accounts:
+        idx = ledger.index.get(acct)
+        if idx is None:
+            continue
+        i, j = idx.span(lo, lo if hi is None else hi)
+        if hi is None:
+            j = len(idx)
+        seen.update(key & _SEQMASK for key, epos, cum in idx.items(i, j))
+    return sorted(seen)
+
+
+def transactions(ledger, start=None, end=None, accounts=None):
+    '''ledger's transactions in the order entered, posted from start
+    through end (inclusive) and, given accounts, posting to one of them'''
+    tx = ledger.transactions
+    if accounts is not None:
+        for i in _positions(ledger, _accounts(ledger, accounts), start, end):
+            yield tx[i]
+        return
+    lo = None if start is None else start.toordinal()
+    hi = None if end is None else end.toordinal()
+    for tran in tx:
+        if lo is not None or hi is not None:
+            day = tran.dtposted.toordinal()
+            if (lo is not None and day < lo) or (hi is not None and day > hi):
+                continue
+        yield tran
+
+
+def _journal_rows(tran):
+    for e in tran.entries:
+        amount = dollars(e.amount)
+        yield (tran.tid, tran.dtposted, tran.memo, e.account,
+               amount if e.debit else None, None if e.debit else amount,
+               e.memo)
+
+
+def journal(ledger, start=None, end=None, accounts=None):
+    '''the transactions, as Ledger.show_transactions prints them; one row
+    per entry'''
+    return Report(JOURNAL, transactions(ledger, start, end, accounts),
+                  _journal_rows, str)
+
+
+def _balance_records(ledger, as_of, accounts):
+    if accounts is None:
+        accts = iter(ledger.coa)
+    else:
+        accts = _accounts(ledger, accounts)
+    for acct in accts:
+        if as_of is not None:
+            if acct in ledger.index or acct in ledger.opening:
+                yield acct, ledger.get_balance(acct, as_of)
+            continue
+        bal = ledger.balances.get(acct)
+        if bal is not None:
+            yield acct, bal
+
+
+def balances(ledger, as_of=None, accounts=None):
+    '''the balance of every account with one (or of accounts), in chart
+    order, as Ledger.show_balances prints them'''
+    return Report(BALANCES, _balance_records(ledger, as_of, accounts),
+                  lambda r: ((r[0], dollars(r[1])),),
+                  lambda r: '{:30} {:>10}'.format(str(r[0]), dollars(r[1])))
+
+
+def _register_records(ledger, acct, start, end):
+    idx = ledger.index.get(acct)
+    if idx is None:
+        return
+    lo = 0 if start is None else _postkey(start, 0)
+    if end is None:
+        i, j = idx.span(lo, lo)[0], len(idx)
+    else:
+        i, j = idx.span(lo, _postkey(end) + 1)
+    tx = ledger.transactions
+    for key, epos, cum in idx.items(i, j):
+        tran = tx[key & _SEQMASK]
+        yield tran, tran.entries[epos], cum
+
+
+def _register_rows(r):
+    tran, e, bal = r
+    amount = dollars(e.amount)
+    return ((tran.dtposted, tran.tid, tran.memo, amount if e.debit else None,
+             None if e.debit else amount, dollars(bal)),)
+
+
+def _register_text(r):
+    tran, e, bal = r
+    amount = dollars(e.amount)
+    return '{:10} {:>4} {:30} {:>10} {:>10} {:>10}'.format(
+        tran.dtposted.isoformat(), tran.tid, tran.memo,
+        amount if e.debit else '', '' if e.debit else amount, dollars(bal))
+
+
+def register(ledger, acct, start=None, end=None):
+    '''acct's postings from start through end with the running balance'''
+    acct, = _accounts(ledger, [acct])
+    return Report(REGISTER, _register_records(ledger, acct, start, end),
+                  _register_rows, _register_text)
+
+
+def form(lines):
+    '''a tax form (a dict of line: value, e.g. from f1040ez) by line'''
+    return Report(FORM, iter(sorted(lines.items())), lambda r: (r,),
+                  lambda r: '{:5} {:>10}'.format(*r))
+
+
+def page(report, number, size=50):
+    '''page number (from 1) of report, size records to a page'''
+    if number < 1:
+        raise ValueError('pages are numbered from 1')
+    start = (number - 1) * size
+    return report._replace(records=islice(report.records, start, start + size))
+
+
+def _plain(value):
+    if isinstance(value, Account):
+        return value.name
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class _Lines(list):
+    '''a list csv.writer can write to'''
+    write = list.append
+
+
+class TextSink:
+    '''each record as text, one or more lines'''
+
+    def __init__(self, fo, buffer=1000):
+        self.fo = fo
+        self.buffer = buffer
+        self.lines = _Lines()
+
+    def flush(self):
+        if self.lines:
+            self.fo.write(''.join(self.lines))
+            del self.lines[:]
+
+    def begin(self, report):
+        pass
+
+    def record(self, report, rec):
+        self.lines.append(report.text(rec) + '\n')
+
+    def write(self, report):
+        self.begin(report)
+        lines = self.lines
+        for rec in report.records:
+            self.record(report, rec)
+            if len(lines) >= self.buffer:
+                self.flush()
+        self.flush()
+
+
+class CSVSink(TextSink):
+    '''a header row of field names, then every row; open fo with
+    newline=\'\''''
+
+    def __init__(self, fo, buffer=1000, header=True):
+        TextSink.__init__(self, fo, buffer)
+        self.header = header
+        self.writer = csv.writer(self.lines)
+
+    def begin(self, report):
+        if self.header:
+            self.writer.writerow(report.fields)
+
+    def record(self, report, rec):
+        writerow = self.writer.writerow
+        for row in report.flatten(rec):
+            writerow(['' if v is None else _plain(v) for v in row])
+
+
+class JSONLinesSink(TextSink):
+    '''every row as a JSON object of its fields, one to a line'''
+
+    def record(self, report, rec):
+        fields = report.fields
+        for row in report.flatten(rec):
+            self.lines.append(json.dumps(
+                dict(zip(fields, [_plain(v) for v in row]))) + '\n')
+
+
+def write(report, sink):
+    sink.write(report)
@@ -0,0 +1,192 @@
+# -*- coding: utf8 -*-
+'''budget rules as data, compiled against a chart of accounts
+
+A rule set is a list of steps, each a dict, run in order on every event:
+
+    sweep     move all of a positive source balance to dest
+              (round: only whole cents, leaving the fraction behind)
+    allocate  move rate times a positive source balance to dest
+    fill      top dest up to level, from each of sources in turn, as far
+              as their positive balances go; one transaction (a source
+              at or below zero is passed over)
+
+Every step names its accounts by name or number and has the memo of the
+transaction it posts.  An amount (level) may be the name of a parameter
+given when the rules are compiled.  Rates and amounts may be strings or
+numbers.  Rule sets can live in JSON files:
+
+    program = compile_rules(load_rules('budget.json'), coa, MICROS,
+                            efundlevel='1000.00')
+    ds = DateSelect([BCM(weekly, program), ...])
+
+compile_rules() looks every account up once and turns the steps into a
+flat list of operations.  Running the program reads each balance it needs
+from the ledger once, keeps it up to date itself as the steps move money,
+and enters all the transactions as one Ledger.enter_many batch.
+'''
+
+from __future__ import print_function, unicode_literals, division, absolute_import
+
+import json
+
+from simple import D, Credit, Debit
+
+# the weekly budget: pay tithing, keep the emergency fund full, spend 3%
+# of the cash, put the rest aside for a mission and the saving into a Roth
+BCM1 = [
+    dict(op='sweep', source='allocated tithing', dest='tithing', round=True,
+         memo='pay thithing'),
+    dict(op='fill', dest='emergency fund', level='efundlevel',
+         sources=['allocated saving', 'cash'],
+         memo='transfer to emergency fund'),
+    dict(op='allocate', source='cash', dest='allocated living', rate='0.03',
+         memo='allocate for living expenses'),
+    dict(op='sweep', source='cash', dest='midterm fund',
+         memo='save for mission'),
+    dict(op='sweep', source='allocated saving', dest='Roth IRA',
+         memo='save for retirement'),
+]
+
+# once a year: empty the giving and living envelopes
+GIVEAWAY = [
+    dict(op='sweep', source='allocated giving', dest='temple patron',
+         memo='empty giving envelope'),
+    dict(op='sweep', source='allocated living', dest='misc expenses',
+         memo='empty living envelope'),
+]
+
+SWEEP, ALLOCATE, FILL = range(3)
+
+
+def _written(value):
+    '''a JSON float as it was written (0.03, not its binary value)'''
+    return str(value) if isinstance(value, float) else value
+
+
+def load_rules(fname):
+    with open(fname) as fi:
+        return json.load(fi)
+
+
+class Program:
+    '''compiled rules; call it as a BCM service: program(ledger, when)'''
+
+    def __init__(self, ops, money):
+        self.ops = ops
+        self.money = money
+
+    def __call__(self, ledger, when):
+        money = ledger.money
+        if money is not self.money:
+            raise ValueError('rules were compiled for {}'.format(
+                type(self.money).__name__))
+        zero = money.ZERO
+        balances = ledger.balances
+        bals = {}
+        batch = []
+        for code, dest, source, arg, memo in self.ops:
+            if code == FILL:
+                have = bals.get(dest)
+                if have is None:
+                    have = bals[dest] = balances.get(dest, zero)
+                need = arg - have
+                if need <= zero:
+                    continue
+                credits = []
+                for acct in source:
+                    bal = bals.get(acct)
+                    if bal is None:
+                        bal = bals[acct] = balances.get(acct, zero)
+                    if bal > zero:
+                        take = bal if bal < need else need
+                        credits.append(Credit(when, acct, take))
+                        bals[acct] = bal - take
+                        need -= take
+                        if need <= zero:
+                            break
+                if credits:
+                    total = arg - have - need
+                    bals[dest] = have + total
+                    batch.append((when, memo,
+                                  [Debit(when, dest, total)] + credits))
+                continue
+
+            bal = bals.get(source)
+            if bal is None:
+                bal = bals[source] = balances.get(source, zero)
+            if bal <= zero:
+                continue
+            if code == SWEEP:
+                amount = money.round(bal) if arg else bal
+            else:
+                amount = money.mul(bal, arg)
+            if amount <= zero:
+                continue
+            bals[source] = bal - amount
+            have = bals.get(dest)
+            if have is None:
+                have = balances.get(dest, zero)
+            bals[dest] = have + amount
+            batch.append((when, memo, (Debit(when, dest, amount),
+                                       Credit(when, source, amount))))
+        if batch:
+            return ledger.enter_many(batch)
+
+
+def compile_rules(rules, coa, money, **params):
+    '''a Program running rules with coa's accounts and money's amounts'''
+
+    def account(name):
+        acct = coa.get(name)
+        if acct is None:
+            raise KeyError('no account {!r} in the chart of accounts'.format(
+                name))
+        return acct
+
+    def amount(value):
+        return money.amount(_written(params.get(value, value)))
+
+    ops = []
+    for step in rules:
+        op = step['op']
+        memo = step['memo']
+        if op == 'sweep':
+            ops.append((SWEEP, account(step['dest']), account(step['source']),
+                        bool(step.get('round')), memo))
+        elif op == 'allocate':
+            ops.append((ALLOCATE, account(step['dest']),
+                        account(step['source']), D(_written(step['rate'])),
+                        memo))
+        elif op == 'fill':
+            ops.append((FILL, account(step['dest']),
+                        tuple(account(s) for s in step['sources']),
+                        amount(step['level']), memo))
+        else:
+            raise ValueError('unknown rule {!r}'.format(op))
+    return Program(ops, money)
+
+
+# (rules as JSON, chart, money, params) -> Program, for rules run as
+# functions
+_programs = {}
+# the rule sets above, which are never changed, by name
+_NAMES = (('BCM1', BCM1), ('GIVEAWAY', GIVEAWAY))
+
+
+def _text(rules):
+    for name, known in _NAMES:
+        if rules is known:
+            return name
+    return json.dumps(rules, sort_keys=True)
+
+
+def compiled(rules, coa, money, **params):
+    '''compile_rules, remembering the Program for the next call with the
+    same rules (by content), chart, money and params'''
+    key = (_text(rules), coa, money, tuple(sorted(params.items())))
+    program = _programs.get(key)
+    if program is None:
+        if len(_programs) >= 64:
+            _programs.clear()
+        program = _programs[key] = compile_rules(rules, coa, money, **params)
+    return program
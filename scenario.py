@@ -0,0 +1,61 @@
+# -*- coding: utf8 -*-
+'''household plans to simulate
+
+A scenario function takes the plan's parameters as keyword arguments and
+returns a Scenario: a fresh ledger, the recurrences to run against it, the
+date to run until, and the milestones ("key dates") worth reporting.
+'''
+
+from __future__ import print_function, unicode_literals, division, absolute_import
+
+from collections import namedtuple
+from datetime import date, datetime
+from functools import partial
+
+from dateutil.rrule import rrule, WEEKLY, MONTHLY, TH
+from dateutil.relativedelta import relativedelta
+
+from simple import (D, ChartofAccounts, Ledger, DECIMAL, MICROS, Paycheck,
+                    Savings, Mission, BCM, bcm1)
+
+Scenario = namedtuple('Scenario', 'ledger,recurring,until,milestones')
+
+
+def household(hours=D('40.0'), rate=D('13.50'), efundlevel=D('500.00'),
+              mission=None, years=5, start=date(2015, 1, 1),
+              accounts='accounts.csv', money='decimal'):
+    '''one weekly paycheck run through bcm1, with the usual savings
+
+    mission is the date a 24 month, $450 mission starts, if any.
+    '''
+    coa = ChartofAccounts()
+    coa.load_csv(accounts)
+    start = datetime(start.year, start.month, start.day)
+    until = start + relativedelta(years=int(years))
+
+    startofmonth = rrule(MONTHLY, dtstart=start, bymonthday=1, until=until)
+    recurring = [
+        Paycheck(rrule(WEEKLY, dtstart=start, until=until, byweekday=TH),
+                 'work', D(hours), D(rate)),
+        Savings(startofmonth, coa.get('non-taxable interest'),
+                coa.get('Roth IRA'), D('0.12') / 12),
+        Savings(startofmonth, coa.get('interest earned'),
+                coa.get('emergency fund'), D('0.0065') / 12),
+        Savings(startofmonth, coa.get('interest earned'),
+                coa.get('midterm fund'), D('0.0065') / 12),
+        BCM(rrule(WEEKLY, dtstart=start, until=until, byweekday=TH),
+            partial(bcm1, efundlevel=D(efundlevel))),
+    ]
+    if mission is not None:
+        recurring.append(Mission(rrule(MONTHLY, dtstart=mission, count=24),
+                                 D('450.00')))
+
+    ledger = Ledger(coa, None, DECIMAL if money == 'decimal' else MICROS)
+    efund = coa.get('emergency fund')
+    level = ledger.money.amount(efundlevel)
+    midterm = coa.get('midterm fund')
+    milestones = {
+        'emergency fund full': lambda ledger: ledger.get_balance(efund) >= level,
+        'midterm fund overdrawn': lambda ledger: ledger.get_balance(midterm) < 0,
+    }
+    return Scenario(ledger, recurring, until, milestones)
@@ -4,11 +4,16 @@ setup(
     name='myfi',
     version='0.1.0',
     packages=find_packages(),
+    py_modules=['simple', 'f1040ez', 'projection', 'journal', 'scenario',
+                'sweep', 'montecarlo', 'checkpoint', 'debt',
+                'instrument', 'rules', 'reports'],
     include_package_data=True,
     install_requires=[
         'click',
         'sqlalchemy',
         'ofxparse',
+        'python-dateutil',
+        'numpy',
     ],
     entry_points='''
         [console_scripts]
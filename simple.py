@@ -1,9 +1,16 @@
 # -*- coding: utf8 -*-
 
 from __future__ import print_function, unicode_literals, division, absolute_import
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
 from collections import namedtuple, OrderedDict
 
+from datetime import date, datetime
 from decimal import Decimal as D
+from time import perf_counter
+
+from dateutil.rrule import rrule
 
 ZERO = D('0.00')
 TITHE = D('0.1')
@@ -12,6 +19,111 @@ MEDI = D('0.0145')
 FICAMED = FICA + MEDI
 
 
+def _rdiv(n, d):
+    '''n / d rounded half-even to an integer (d > 0)'''
+    q, r = divmod(n, d)
+    r += r
+    if r > d or (r == d and q & 1):
+        q += 1
+    return q
+
+
+class DecimalMoney:
+    '''amounts are Decimal dollars
+
+    Products and quotients keep their fractional cents until a rule
+    explicitly rounds them.  This is the default representation.
+    '''
+    ZERO = ZERO
+
+    def amount(self, value):
+        '''convert a dollar value (str, int or Decimal) to an amount'''
+        return D(value).quantize(ZERO)
+
+    def mul(self, amount, rate, cache=True):
+        return amount * rate
+
+    def div(self, amount, n):
+        return amount / n
+
+    def round(self, amount):
+        return amount.quantize(ZERO)
+
+
+class FixedMoney:
+    '''amounts are integers, UNITS (a million) to the dollar
+
+    Sums are plain integer additions.  Amounts entered are whole cents;
+    products and quotients are rounded half-even to the millionth as
+    they are made and round() takes them to the cent, so rules that
+    carry fractional cents (tithe / 2, 3% of cash) come out as they do
+    in DecimalMoney.
+
+    The ratios of the rates given to mul() and the amounts made from
+    dollar values are remembered, CACHE of each at most; pass cache=False
+    for a rate that is only used once, such as a growth factor.
+    '''
+    ZERO = 0
+    UNITS = 10 ** 6
+    CENT = UNITS // 100
+    CACHE = 256
+
+    def __init__(self):
+        self._ratios = {}
+        self._amounts = {}
+
+    def amount(self, value):
+        amounts = self._amounts
+        a = amounts.get(value)
+        if a is None:
+            n, d = D(value).as_integer_ratio()
+            a = _rdiv(n * 100, d) * self.CENT
+            if len(amounts) >= self.CACHE:
+                amounts.clear()
+            amounts[value] = a
+        return a
+
+    def mul(self, amount, rate, cache=True):
+        ratio = self._ratios.get(rate)
+        if ratio is None:
+            ratio = D(rate).as_integer_ratio()
+            if cache:
+                if len(self._ratios) >= self.CACHE:
+                    self._ratios.clear()
+                self._ratios[rate] = ratio
+        n, d = ratio
+        # _rdiv(amount * n, d), inline
+        q, r = divmod(amount * n, d)
+        r += r
+        if r > d or (r == d and q & 1):
+            q += 1
+        return q
+
+    def div(self, amount, n):
+        return _rdiv(amount, n)
+
+    def round(self, amount):
+        q, r = divmod(amount, 10000)
+        if not r:
+            return amount
+        if r > 5000 or (r == 5000 and q & 1):
+            q += 1
+        return q * 10000
+
+
+DECIMAL = DecimalMoney()
+MICROS = FixedMoney()
+# the integer policy's first name, from when it counted cents
+CENTS = MICROS
+
+
+def dollars(amount):
+    '''amount as Decimal dollars rounded to the cent, for display'''
+    if type(amount) is int:
+        return D(_rdiv(amount, FixedMoney.CENT)).scaleb(-2)
+    return amount.quantize(ZERO)
+
+
 def counter(x=0):
     while True:
         x += 1
@@ -20,6 +132,7 @@ def counter(x=0):
 
 class Account:
     DEBIT_BALANCE = True
+    KIND = None
 
     def __init__(self, name, number):
         self.name = name
@@ -34,47 +147,114 @@ class Account:
 
 
 class AssetAccount(Account):
-    pass
+    KIND = 'asset'
 
 
 class LiabilityAccount(Account):
     DEBIT_BALANCE = False
+    KIND = 'liability'
 
 
 class EquityAccount(Account):
     DEBIT_BALANCE = False
+    KIND = 'equity'
 
 
 class RevenueAccount(Account):
     DEBIT_BALANCE = False
+    KIND = 'revenue'
 
 
 class ExpenseAccount(Account):
-    pass
+    KIND = 'expense'
+
+
+KINDS = ('asset', 'liability', 'equity', 'revenue', 'expense')
+
+
+def _number(acct):
+    return acct.number
 
 
 TYPEMAP = dict(A=AssetAccount, L=LiabilityAccount,
                Q=EquityAccount, R=RevenueAccount, E=ExpenseAccount,)
 
 
+def parent(number):
+    '''the group a number (or group) is in: 611.1 in 611, 611 in 61, 61
+    in 6, 6 in the root group (''); None for the root'''
+    if not number:
+        return None
+    head, dot, sub = number.rpartition('.')
+    return head if dot else number[:-1]
+
+
 class ChartofAccounts:
-    __slots__ = ('by_name', 'by_number')
+    '''accounts by name and by number
+
+    Numbers form a hierarchy of groups by prefix: 1 holds every 1xx
+    account, 11 the 11x ones, 611 holds 611 and 611.1.  The accounts are
+    kept sorted by number, so a group or a range of numbers is a slice.
+    '''
+    __slots__ = ('by_name', 'by_number', 'keys', 'numbers', 'accounts')
 
     def __init__(self):
         self.by_name = {}
         self.by_number = {}
+        # names and numbers in one dict, a name winning over a number
+        self.keys = {}
+        # sorted numbers and their accounts
+        self.numbers = []
+        self.accounts = []
 
     def add(self, acct):
         self.by_name[acct.name] = acct
-        self.by_number[acct.number] = acct
+        self.keys[acct.name] = acct
+        number = acct.number
+        if number not in self.by_name:
+            self.keys[number] = acct
+        i = bisect_left(self.numbers, number)
+        if number in self.by_number:
+            self.accounts[i] = acct
+        else:
+            self.numbers.insert(i, number)
+            self.accounts.insert(i, acct)
+        self.by_number[number] = acct
 
     def get(self, key, default=None):
-        return self.by_name.get(key) or self.by_number.get(key, default)
+        return self.keys.get(key, default)
 
     def __iter__(self):
-        l = list(self.by_number.items())
-        l.sort()
-        yield from [v for k, v in l]
+        return iter(self.accounts)
+
+    def __len__(self):
+        return len(self.accounts)
+
+    def between(self, lo, hi):
+        '''accounts numbered lo up to, not including, hi'''
+        numbers = self.numbers
+        return self.accounts[bisect_left(numbers, lo):bisect_left(numbers, hi)]
+
+    def group(self, prefix):
+        '''accounts whose number starts with prefix, e.g. 11 or 1'''
+        numbers = self.numbers
+        i = j = bisect_left(numbers, prefix)
+        n = len(numbers)
+        while j < n and numbers[j].startswith(prefix):
+            j += 1
+        return self.accounts[i:j]
+
+    def children(self, prefix=''):
+        '''the groups one level below prefix, e.g. 11, 12, ... 19 in 1'''
+        kids = []
+        for acct in self.group(prefix):
+            number = acct.number
+            while number is not None and parent(number) != prefix:
+                number = parent(number)
+            if number is not None and number != prefix and (
+                    not kids or kids[-1] != number):
+                kids.append(number)
+        return kids
 
     def load_csv(self, fname):
         with open(fname, 'rt') as fi:
@@ -87,6 +267,7 @@ class ChartofAccounts:
 
 
 class Entry:
+    __slots__ = ('dtorig', 'dtposted', 'account', 'debit', 'amount', 'memo')
 
     def __init__(self, dtorig, dtposted, account, debit, amount, memo):
         self.dtorig = dtorig
@@ -98,7 +279,7 @@ class Entry:
 
     def __str__(self):
         memo = self.memo or ''
-        amount = self.amount.quantize(ZERO)
+        amount = dollars(self.amount)
         if self.debit:
             return '{:30} {:>10}                {}'.format(str(self.account), amount, memo)
         else:
@@ -123,153 +304,558 @@ class Transaction(namedtuple('Transaction', 'tid,dtposted,memo,entries')):
         return '\n    '.join(l)
 
 
+Posting = namedtuple('Posting', 'dtposted,tid,entry,balance')
+
+# postings are ordered by (date, position in ledger.transactions), packed
+# into one int
+_SEQBITS = 32
+_SEQMASK = (1 << _SEQBITS) - 1
+
+
+def _postkey(when, seq=_SEQMASK):
+    return (when.toordinal() << _SEQBITS) | seq
+
+
+class PostingIndex:
+    '''postings to one account, date-ordered, with running balances
+
+    keys[i] packs the posting date and the position of its transaction
+    in the ledger, epos[i] is the entry's position in that transaction and
+    cums[i] is the account balance after it.
+
+    A forked Ledger's index starts with the first n postings of base, as
+    SharedPrefix does with transactions: keys, epos and cums then hold
+    only the postings after those, and top is the key of the last shared
+    one.  Postings dated before top make the index copy the shared part.
+    '''
+    __slots__ = ('opening', 'keys', 'epos', 'cums', 'base', 'n', 'top')
+
+    def __init__(self, opening, cents=False):
+        self.opening = opening
+        self.keys = array('q')
+        self.epos = array('l')
+        self.cums = array('q') if cents else []
+        self.base = None
+        self.n = 0
+        self.top = -1
+
+    def __len__(self):
+        return self.n + len(self.keys)
+
+    def _own(self):
+        '''copy the shared postings into our own arrays'''
+        base, n = self.base, self.n
+        self.keys = base.keys[:n] + self.keys
+        self.epos = base.epos[:n] + self.epos
+        self.cums = base.cums[:n] + self.cums
+        self.base = None
+        self.n = 0
+        self.top = -1
+
+    def insert(self, key, epos, delta):
+        '''add a posting dated before the latest one'''
+        if self.base is not None:
+            self._own()
+        keys = self.keys
+        cums = self.cums
+        i = bisect_right(keys, key)
+        keys.insert(i, key)
+        self.epos.insert(i, epos)
+        cums.insert(i, (cums[i - 1] if i else self.opening) + delta)
+        for j in range(i + 1, len(cums)):
+            cums[j] += delta
+
+    def balance(self, key):
+        '''balance after every posting ordered before key'''
+        i = bisect_left(self.keys, key)
+        if i:
+            return self.cums[i - 1]
+        base = self.base
+        if base is None:
+            return self.opening
+        i = bisect_left(base.keys, key, 0, self.n)
+        return base.cums[i - 1] if i else self.opening
+
+    def _position(self, key):
+        i = bisect_left(self.keys, key)
+        if i or self.base is None:
+            return self.n + i
+        return bisect_left(self.base.keys, key, 0, self.n)
+
+    def span(self, lo, hi):
+        return self._position(lo), self._position(hi)
+
+    def items(self, i, j):
+        '''(key, epos, cum) for the postings at positions i through j - 1'''
+        n = self.n
+        if i < n:
+            base = self.base
+            for k in range(i, min(j, n)):
+                yield base.keys[k], base.epos[k], base.cums[k]
+        for k in range(max(i - n, 0), j - n):
+            yield self.keys[k], self.epos[k], self.cums[k]
+
+    def copy(self):
+        idx = PostingIndex.__new__(PostingIndex)
+        idx.opening = self.opening
+        idx.keys = self.keys[:]
+        idx.epos = self.epos[:]
+        idx.cums = self.cums[:]
+        idx.base = self.base
+        idx.n = self.n
+        idx.top = self.top
+        if idx.base is not None:
+            idx._own()
+        return idx
+
+    def share(self):
+        '''an index for a fork, sharing our postings so far'''
+        idx = PostingIndex.__new__(PostingIndex)
+        idx.opening = self.opening
+        if self.base is None:
+            idx.base = self
+            idx.n = len(self.keys)
+            idx.keys = self.keys[:0]
+            idx.epos = self.epos[:0]
+            idx.cums = self.cums[:0]
+        else:
+            # our own postings are few: the ones since we were forked
+            idx.base = self.base
+            idx.n = self.n
+            idx.keys = self.keys[:]
+            idx.epos = self.epos[:]
+            idx.cums = self.cums[:]
+        idx.top = idx.base.keys[idx.n - 1] if idx.n else -1
+        return idx
+
+    def shared(self):
+        '''(index, length) naming the postings we hold, the same for two
+        indexes holding the same postings through sharing'''
+        if self.base is None or self.keys:
+            return self, len(self.keys)
+        return self.base, self.n
+
+
+class SharedPrefix:
+    '''the first n items of an append-only sequence, plus our own
+
+    A forked Ledger's transactions: the base keeps growing on its own
+    branch, this one only ever sees base[:n].
+    '''
+    __slots__ = ('base', 'n', 'tail')
+
+    def __init__(self, base, n=None):
+        self.base = base
+        self.n = len(base) if n is None else n
+        self.tail = []
+
+    def __len__(self):
+        return self.n + len(self.tail)
+
+    def append(self, item):
+        self.tail.append(item)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+            if i < 0:
+                raise IndexError(i)
+        return self.base[i] if i < self.n else self.tail[i - self.n]
+
+    def __iter__(self):
+        base = self.base
+        for i in range(self.n):
+            yield base[i]
+        yield from self.tail
+
+
 class Ledger:
     _nextid = iter(counter()).__next__
 
-    def __init__(self, coa, balances=None,):
+    def __init__(self, coa, balances=None, money=DECIMAL, transactions=None):
         self.coa = coa
-        self.transactions = []
+        self.money = money
+        # any append-only sequence of Transactions, e.g. a journal.Journal
+        self.transactions = [] if transactions is None else transactions
         if balances is None:
             balances = {}
         self.opening = balances.copy()
         self.balances = balances
+        self.index = {}
+        # accounts whose PostingIndex a fork's index shares postings of
+        self._cow = set()
+        # KIND -> the accounts in opening or index, by number, and the
+        # total of their balances, kept up to date as postings are applied
+        self.kinds = {kind: [] for kind in KINDS}
+        self.totals = dict.fromkeys(KINDS, money.ZERO)
+        for acct, bal in self.opening.items():
+            self._join(acct)
+            self.totals[acct.KIND] += bal
+        # group prefix -> the total of its accounts' balances, for the
+        # groups asked for, and acct -> the groups it adds to
+        self.rollups = {}
+        self._watch = {}
+
+    def _join(self, acct):
+        kind = acct.KIND
+        accts = self.kinds.get(kind)
+        if accts is None:
+            accts = self.kinds[kind] = []
+            self.totals[kind] = self.money.ZERO
+        accts.append(acct)
+        accts.sort(key=_number)
+
+    def _unbalanced(self, dr, cr):
+        '''the error for entries whose debits total dr and credits cr'''
+        zero = self.money.ZERO
+        if type(dr) is not type(zero) or type(cr) is not type(zero):
+            return TypeError(
+                'amounts must be {} for {}: convert them with '
+                'ledger.money.amount()'.format(type(zero).__name__,
+                                               type(self.money).__name__))
+        if dr != cr:
+            return ValueError('entries do not balance {}!={}'.format(dr, cr))
 
     def enter(self, dtorigin, memo, *entries):
-        dr = cr = ZERO
+        zero = self.money.ZERO
+        kind = type(zero)
+        dr = cr = zero
         for e in entries:
             if e.debit:
                 dr += e.amount
             else:
                 cr += e.amount
-        if dr != cr:
-            raise ValueError('entries do not balance {}!={}'.format(dr, cr))
+        if dr != cr or type(dr) is not kind or type(cr) is not kind:
+            raise self._unbalanced(dr, cr)
 
         tran = Transaction(self._nextid(), dtorigin, memo, entries)
         self.apply(tran)
         return tran
 
-    def apply(self, tran):
+    def enter_many(self, batch):
+        '''enter several transactions at once
+
+        batch is a sequence of (dtorigin, memo, entries) with entries a
+        sequence of Entry.  Nothing is entered unless every transaction
+        balances.
+        '''
+        zero = self.money.ZERO
+        kind = type(zero)
+        for dtorigin, memo, entries in batch:
+            dr = cr = zero
+            for e in entries:
+                if e.debit:
+                    dr += e.amount
+                else:
+                    cr += e.amount
+            if dr != cr or type(dr) is not kind or type(cr) is not kind:
+                raise self._unbalanced(dr, cr)
 
-        self.transactions.append(tran)
-        for e in tran.entries:
-            acct = e.account
-            bal = self.balances.get(acct, ZERO)
-            if e.debit == acct.DEBIT_BALANCE:
-                bal += e.amount
-            else:
-                bal -= e.amount
-            self.balances[acct] = bal
+        nextid = self._nextid
+        trans = [Transaction(nextid(), dtorigin, memo, tuple(entries))
+                 for dtorigin, memo, entries in batch]
+        self._apply(trans)
+        return trans
+
+    def apply(self, tran):
+        self._apply((tran,))
+
+    def _apply(self, trans):
+        '''append balanced transactions and post their entries'''
+        zero = self.money.ZERO
+        transactions = self.transactions
+        balances = self.balances
+        index = self.index
+        cow = self._cow
+        totals = self.totals
+        rollups = self.rollups
+        watch = self._watch
+        for tran in trans:
+            key = _postkey(tran.dtposted, len(transactions))
+            transactions.append(tran)
+            for epos, e in enumerate(tran.entries):
+                acct = e.account
+                delta = e.amount if e.debit == acct.DEBIT_BALANCE else -e.amount
+                bal = balances[acct] = balances.get(acct, zero) + delta
+                idx = index.get(acct)
+                if idx is None:
+                    idx = index[acct] = PostingIndex(
+                        self.opening.get(acct, zero), self.money is MICROS)
+                    if acct not in self.opening:
+                        self._join(acct)
+                        if rollups:
+                            self._watched(acct)
+                keys = idx.keys
+                if key < (keys[-1] if keys else idx.top):
+                    if cow and acct in cow:
+                        idx = index[acct] = idx.copy()
+                        cow.discard(acct)
+                    idx.insert(key, epos, delta)
+                else:
+                    # the usual case: the latest posting, so cums[-1] == bal
+                    keys.append(key)
+                    idx.epos.append(epos)
+                    idx.cums.append(bal)
+                totals[acct.KIND] += delta
+                if watch:
+                    for group in watch.get(acct, ()):
+                        rollups[group] += delta
+
+    def fork(self):
+        '''a branch of this ledger: the same history, separate futures
+
+        The branch shares the transactions so far and every account's
+        postings with this ledger.  Each side appends its new postings on
+        its own; an account's shared postings are only copied when one
+        side posts to it out of date order.  Only the balances dict and
+        one small index per account are made up front.
+        '''
+        branch = Ledger.__new__(Ledger)
+        branch.coa = self.coa
+        branch.money = self.money
+        branch.opening = self.opening
+        branch.transactions = SharedPrefix(self.transactions)
+        branch.balances = self.balances.copy()
+        branch.index = {acct: idx.share() for acct, idx in self.index.items()}
+        self._cow.update(acct for acct, idx in self.index.items()
+                         if idx.base is None)
+        branch._cow = set()
+        branch.kinds = {kind: list(accts) for kind, accts in self.kinds.items()}
+        branch.totals = self.totals.copy()
+        branch.rollups = self.rollups.copy()
+        branch._watch = self._watch.copy()
+        return branch
+
+    def diff(self, other):
+        '''{acct: (our balance, their balance)} where they differ
+
+        Accounts neither ledger has posted to since they forked are
+        skipped without looking at their balances.
+        '''
+        zero = self.money.ZERO
+        changed = {}
+        for acct in set(self.balances) | set(other.balances):
+            idx = self.index.get(acct)
+            theirs = other.index.get(acct)
+            if idx is not None and theirs is not None and \
+                    idx.shared() == theirs.shared():
+                continue
+            mine = self.balances.get(acct, zero)
+            theirs = other.balances.get(acct, zero)
+            if mine != theirs:
+                changed[acct] = (mine, theirs)
+        return changed
 
     def get_account(self, key):
         return self.coa.get(key)
 
-    def get_balance(self, acct):
-        return self.balances.get(acct, ZERO)
+    def get_balance(self, acct, as_of=None, before=None):
+        '''balance of acct, by default including everything posted so far
+
+        With as_of, the balance at the end of that day; before (a position
+        in self.transactions) then also leaves out the transactions entered
+        from that point on that day, e.g. the closing entries.
+        '''
+        if as_of is None:
+            return self.balances.get(acct, self.money.ZERO)
+        idx = self.index.get(acct)
+        if idx is None:
+            return self.opening.get(acct, self.money.ZERO)
+        if before is None:
+            return idx.balance(_postkey(as_of) + 1)
+        return idx.balance(_postkey(as_of, before))
+
+    def balances_as_of(self, as_of, before=None):
+        '''every balance as get_balance(acct, as_of, before) sees it'''
+        balances = dict(self.opening)
+        for acct in self.index:
+            balances[acct] = self.get_balance(acct, as_of, before)
+        return balances
+
+    def _watched(self, acct):
+        '''start adding acct's postings to the rollups of its groups'''
+        number = acct.number
+        groups = tuple(g for g in self.rollups if number.startswith(g))
+        if groups:
+            self._watch[acct] = groups
+
+    def rollup(self, group):
+        '''the total balance of the accounts in group (a number prefix,
+        see ChartofAccounts.group), as posted so far
+
+        The first call adds up the group; from then on the ledger keeps
+        the total up to date as it posts.  Balances are added as the
+        accounts keep them, so a group mixing debit and credit balance
+        accounts nets them out.
+        '''
+        total = self.rollups.get(group)
+        if total is not None:
+            return total
+        total = self.money.ZERO
+        balances = self.balances
+        for acct in self.coa.group(group):
+            bal = balances.get(acct)
+            if bal is not None:
+                total += bal
+                self._watch[acct] = self._watch.get(acct, ()) + (group,)
+        self.rollups[group] = total
+        return total
+
+    def subtotals(self, group=''):
+        '''[(child group, rollup)] one level below group'''
+        return [(kid, self.rollup(kid)) for kid in self.coa.children(group)]
+
+    def kind_balances(self, kind, as_of=None, before=None):
+        '''[(acct, balance)] for the accounts of kind, by number
+
+        Only the accounts of that kind are looked at; the balances are as
+        get_balance(acct, as_of, before) sees them.
+        '''
+        accts = self.kinds.get(kind, ())
+        if as_of is None:
+            zero = self.money.ZERO
+            return [(acct, self.balances.get(acct, zero)) for acct in accts]
+        get_balance = self.get_balance
+        return [(acct, get_balance(acct, as_of, before)) for acct in accts]
+
+    def postings(self, acct, start=None, end=None):
+        '''register of acct for the days start through end (inclusive)'''
+        idx = self.index.get(acct)
+        if idx is None:
+            return []
+        lo = 0 if start is None else _postkey(start, 0)
+        if end is None:
+            i, j = idx.span(lo, lo)[0], len(idx)
+        else:
+            i, j = idx.span(lo, _postkey(end) + 1)
+        tx = self.transactions
+        l = []
+        for key, epos, cum in idx.items(i, j):
+            tran = tx[key & _SEQMASK]
+            l.append(Posting(tran.dtposted, tran.tid, tran.entries[epos], cum))
+        return l
 
     def show_transactions(self):
-        for tran in self.transactions:
-            print(tran)
+        from reports import TextSink, journal
+        TextSink(sys.stdout).write(journal(self))
 
     def show_balances(self):
-        for acct in self.coa:
-            bal = self.balances.get(acct)
-            if bal is not None:
-                print('{:30} {:>10}'.format(str(acct), bal.quantize(ZERO)))
+        from reports import TextSink, balances
+        TextSink(sys.stdout).write(balances(self))
         if self.transactions:
             print('balances as of {}'.format(self.transactions[-1].dtposted))
 
 
-def bynumber(pair):
-    return pair[0].number
+IncomeStatement = namedtuple(
+    'IncomeStatement',
+    'period,end,revenue,expense,total_revenue,total_expense,net_income')
+BalanceSheet = namedtuple(
+    'BalanceSheet',
+    'when,assets,liabilities,equity,total_assets,total_liabilities,'
+    'total_equity')
+
+
+def _rounded(ledger, kind, as_of, before=None):
+    money = ledger.money
+    lines = [(acct, money.round(val))
+             for acct, val in ledger.kind_balances(kind, as_of, before)]
+    return lines, sum((val for acct, val in lines), money.ZERO)
+
+
+def income_statement(ledger, end, period='year', before=None):
+    '''revenue and expense accounts, rounded, as of the end of a period'''
+    if isinstance(end, datetime):
+        end = end.date()
+    revenue, rtotal = _rounded(ledger, 'revenue', end, before)
+    expense, etotal = _rounded(ledger, 'expense', end, before)
+    return IncomeStatement(period, end, revenue, expense, rtotal, etotal,
+                           ledger.money.round(rtotal - etotal))
+
+
+def balance_sheet(ledger, when, before=None):
+    '''asset, liability and equity accounts, rounded, as of when'''
+    if isinstance(when, datetime):
+        when = when.date()
+    assets, atotal = _rounded(ledger, 'asset', when, before)
+    liabilities, ltotal = _rounded(ledger, 'liability', when, before)
+    equity, qtotal = _rounded(ledger, 'equity', when, before)
+    return BalanceSheet(when, assets, liabilities, equity,
+                        atotal, ltotal, qtotal)
+
+
+def income_statement_lines(stmt):
+    '''an IncomeStatement as text'''
+    lines = ['', 'Income Summary for {} ending {}'.format(stmt.period,
+                                                         stmt.end),
+             'Income']
+    for acct, v in stmt.revenue:
+        lines.append('{:30} {:>10}'.format(str(acct), dollars(v)))
+    lines.append('total income:                             {:>10}'.format(
+        dollars(stmt.total_revenue)))
+    lines.append('Expenses')
+    for acct, v in stmt.expense:
+        lines.append('{:30} {:>10}'.format(str(acct), dollars(v)))
+    lines.append('total expenses:                           {:>10}'.format(
+        dollars(stmt.total_expense)))
+    ni = stmt.net_income
+    if ni >= ZERO:
+        lines.append('Net income:                               {:>10}'.format(
+            dollars(ni)))
+    else:
+        lines.append('Net loss:                                ({:>10})'.format(
+            dollars(-ni)))
+    return lines
+
+
+def balance_sheet_lines(sheet):
+    '''a BalanceSheet as text'''
+    lines = ['', 'Balance Sheet as of {}'.format(sheet.when)]
+    for accts, label, total in (
+            (sheet.assets, 'assets', sheet.total_assets),
+            (sheet.liabilities, 'liabilities', sheet.total_liabilities),
+            (sheet.equity, 'equity', sheet.total_equity)):
+        for acct, v in accts:
+            lines.append('{:30} {:>10}'.format(str(acct), dollars(v)))
+        lines.append('{:42}{:>10}'.format('  total {}:'.format(label),
+                                          dollars(total)))
+        lines.append('')
+    lines.append('  total liabilities+equity:               {:>10}'.format(
+        dollars(sheet.total_liabilities + sheet.total_equity)))
+    lines.append('')
+    return lines
 
 
 def closing_entries(ledger, now, period='year'):
-    now = now.date()
-    bal = ledger.balances
-    coa = ledger.coa
-
-    income = []
-    expense = []
-
+    '''close the revenue and expense accounts into equity as of now
+
+    Prints the income statement before closing and the balance sheet
+    after it, and returns both.
+    '''
+    if isinstance(now, datetime):
+        now = now.date()
+    stmt = income_statement(ledger, now, period)
     incomesummary = ledger.get_account('equity')
 
-    for acct, val in bal.items():
-        if isinstance(acct, RevenueAccount):
-            income.append((acct, val.quantize(ZERO)))
-        elif isinstance(acct, ExpenseAccount):
-            expense.append((acct, val.quantize(ZERO)))
-    income.sort(key=bynumber)
-    expense.sort(key=bynumber)
-
-    ie = []
-    rsummary = ZERO
-    for acct, val in income:
-        ie.append(Entry(now, now, acct, True, val, None))
-        rsummary += val
+    ie = [Entry(now, now, acct, True, val, None) for acct, val in stmt.revenue]
     if ie:
-        ie.append(Entry(now, now, incomesummary, False, rsummary, None))
+        ie.append(Entry(now, now, incomesummary, False, stmt.total_revenue,
+                        None))
         ledger.enter(now, 'close revenue accounts', *ie)
 
-    ee = []
-    esummary = ZERO
-    for acct, val in expense:
-        ee.append(Entry(now, now, acct, False, val, None))
-        esummary += val
+    ee = [Entry(now, now, acct, False, val, None) for acct, val in stmt.expense]
     if ee:
-        ee.insert(0, Entry(now, now, incomesummary, True, esummary, None))
+        ee.insert(0, Entry(now, now, incomesummary, True, stmt.total_expense,
+                           None))
         ledger.enter(now, 'close expense accounts', *ee)
 
-    print('\nIncome Summary for {} ending {}'.format(period, now))
-    print('Income')
-    for acct, v in income:
-        print('{:30} {:>10}'.format(str(acct), v.quantize(ZERO)))
-    print('total income:                             {:>10}'.format(rsummary))
-    print('Expenses')
-    for acct, v in expense:
-        print('{:30} {:>10}'.format(str(acct), v.quantize(ZERO)))
-    print('total expenses:                           {:>10}'.format(esummary))
-
-    ni = (rsummary - esummary).quantize(ZERO)
-    if ni >= ZERO:
-        print('Net income:                               {:>10}'.format(ni))
-    else:
-        print('Net loss:                                ({:>10})'.format(-ni))
-
-    print('\nBalance Sheet as of {}'.format(now))
-    asset = []
-    liability = []
-    equity = []
-    for acct, val in bal.items():
-        if isinstance(acct, AssetAccount):
-            asset.append((acct, val.quantize(ZERO)))
-        elif isinstance(acct, LiabilityAccount):
-            liability.append((acct, val.quantize(ZERO)))
-        elif isinstance(acct, EquityAccount):
-            equity.append((acct, val.quantize(ZERO)))
-
-    asset.sort(key=bynumber)
-    acc1 = ZERO
-    for acct, v in asset:
-        acc1 += v
-        print('{:30} {:>10}'.format(str(acct), v))
-    print('  total assets:                           {:>10}\n'.format(acc1))
-
-    liability.sort(key=bynumber)
-    acc2 = ZERO
-    for acct, v in liability:
-        acc2 += v
-        print('{:30} {:>10}'.format(str(acct), v))
-    print('  total liabilities:                      {:>10}\n'.format(acc2))
-
-    equity.sort(key=bynumber)
-    acc3 = ZERO
-    for acct, v in equity:
-        acc3 += v
-        print('{:30} {:>10}'.format(str(acct), v))
-    print('  total equity:                           {:>10}\n'.format(acc3))
-
-    print(
-        '  total liabilities+equity:               {:>10}\n'.format(acc2 + acc3))
+    for line in income_statement_lines(stmt):
+        print(line)
+    sheet = balance_sheet(ledger, now)
+    for line in balance_sheet_lines(sheet):
+        print(line)
+    return stmt, sheet
 
 
 def balance_forward(balances):
@@ -285,68 +871,291 @@ import heapq
 
 
 class DateSelect:
-
-    def __init__(self, recurring):
-        self.pending = pending = []
+    '''service Recurring events in date order
+
+    Events are kept in buckets, one per date, with a heap of the dates
+    themselves: a date's events come off the heap together and are
+    serviced in Recurring.order, so thousands of streams firing on the
+    same days cost one heap operation per day rather than per event.
+
+    With fast_forward, a run of occurrences of a CLOSED_FORM recurrence
+    that come before the next event that might touch the same accounts
+    is handed to its advance() in one go, which posts the combined effect
+    as one summary.  Only other CLOSED_FORM recurrences whose accounts()
+    are known to be different can be passed over.
+    '''
+
+    def __init__(self, recurring, fast_forward=False):
+        self.fast_forward = fast_forward
+        self.days = []
+        self.due = {}
+        # the date whose bucket is sorted for servicing (last order first)
+        self.today = None
         for r in recurring:
-            try:
-                rnext = next(r)
-                pending.append((rnext, r))
-            except StopIteration:
-                pass
+            self.add(r)
 
-        heapq.heapify(pending)
+    @property
+    def pending(self):
+        '''(when, Recurring) for every scheduled event, in service order'''
+        return [(when, r) for when in sorted(self.due)
+                for r in sorted(self.due[when])]
 
     def earliest(self):
-        if self.pending:
-            return self.pending[0][0]
+        if self.days:
+            return self.days[0]
 
     def earliest_before(self, when):
-        if self.pending:
-            e = self.pending[0][0]
+        if self.days:
+            e = self.days[0]
             return e if e < when else None
 
+    def schedule(self, when, r):
+        bucket = self.due.get(when)
+        if bucket is None:
+            self.due[when] = [r]
+            heapq.heappush(self.days, when)
+        else:
+            bucket.append(r)
+            if when == self.today:
+                bucket.sort(reverse=True)
+
     def add(self, r):
         try:
-            rnext = next(r)
-            heapq.heappush(self.pending, (rnext, r))
+            self.schedule(next(r), r)
         except StopIteration:
             pass
 
-    def service_loop(self, ledger, until):
-        pending = self.pending
-        while len(pending) > 0:
-            when, what = pending[0]
-            if when > until:
-                break
-            # try:
-            v = what.service(ledger, when)
+    def pop(self):
+        '''(when, Recurring) of the next event, off the schedule'''
+        when = self.days[0]
+        bucket = self.due[when]
+        if self.today != when:
+            bucket.sort(reverse=True)
+            self.today = when
+        what = bucket.pop()
+        if not bucket:
+            del self.due[when]
+            heapq.heappop(self.days)
+            self.today = None
+        return when, what
+
+    def service_loop(self, ledger, until, stats=None):
+        '''service every event up to until, yielding (v, what, when)
+
+        stats, e.g. an instrument.ServiceStats, is told about each event:
+        stats.record(what, seconds, transactions, entries).
+        '''
+        days = self.days
+        fast = self.fast_forward
+        if stats is not None:
+            tx = ledger.transactions
+            clock = perf_counter
+        while days and days[0] <= until:
+            when, what = self.pop()
+            if stats is not None:
+                n = len(tx)
+                t = clock()
+            if fast and what.CLOSED_FORM:
+                v, when = self.skip(ledger, until, when, what)
+            else:
+                # try:
+                v = what.service(ledger, when)
+                # except Exception as e:
+                #    yield e, what, when
+                # reschedule before yielding, so the loop can be left (and
+                # checkpointed) at any yield without servicing `what` twice
+                self.add(what)
+            if stats is not None:
+                t = clock() - t
+                posted = tx[n:] if len(tx) > n else ()
+                stats.record(what, t, len(posted),
+                             sum(len(tran.entries) for tran in posted))
             yield v, what, when
-            # except Exception as e:
-            #    yield e, what, when
-            try:
+
+    def skip(self, ledger, until, when, what):
+        '''advance a CLOSED_FORM recurrence, just taken off the schedule
+        for when, through its occurrences before the next event of any
+        recurrence touching the same accounts'''
+        mine = what.accounts(ledger)
+        seen = {}
+
+        def independent(r):
+            # another CLOSED_FORM recurrence on other accounts can wait
+            if mine is None or not r.CLOSED_FORM:
+                return False
+            if r not in seen:
+                seen[r] = r.accounts(ledger)
+            return seen[r] is not None and mine.isdisjoint(seen[r])
+
+        horizon = None
+        for w, bucket in self.due.items():
+            if w <= until and (horizon is None or w < horizon) and not all(
+                    independent(r) for r in bucket):
+                horizon = w
+        dates = [when]
+        try:
+            when = next(what)
+            # stop short of the horizon: an event on that same date may
+            # have to go first
+            while when < horizon if horizon is not None else when <= until:
+                dates.append(when)
                 when = next(what)
-                heapq.heapreplace(pending, (when, what))
-            except StopIteration:
-                heapq.heappop(pending)
+            self.schedule(when, what)
+        except StopIteration:
+            pass
+        if len(dates) == 1:
+            return what.service(ledger, dates[0]), dates[0]
+        return what.advance(ledger, dates), dates[-1]
 
 
 class Recurring:
     nextid = iter(counter()).__next__
+    # service() posts the same entries every time, whatever the ledger holds
+    PURE = False
+    # advance() can do many service()s at once, as long as nothing else
+    # touching its accounts() happens in between
+    CLOSED_FORM = False
 
     def __init__(self, recur):
         self.order = self.nextid()
-        self.it = iter(recur)
+        self.recur = recur
+        self.last = None
+        self.it = occurrences(recur)
 
     def __next__(self):
-        return next(self.it)
+        self.last = next(self.it)
+        return self.last
 
     def __lt__(self, other):
         return self.order < other.order
 
+    def __getstate__(self):
+        # the live iterator can't be pickled; recur and last are enough to
+        # start a new one where it left off
+        state = self.__dict__.copy()
+        state.pop('it', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if 'recur' in state:
+            self.it = occurrences(self.recur, self.last)
+
     def service(self, ledger, when):
         raise NotImplemented()
 
+    def advance(self, ledger, dates):
+        for when in dates:
+            v = self.service(ledger, when)
+        return v
+
+    def accounts(self, ledger):
+        '''the set of accounts service() reads or posts to, or None for
+        any of them'''
+        return None
+
+
+class Occurrences:
+    '''iterate an expanded rule: ordinal days, all at the same time of day'''
+    __slots__ = ('days', 'time', 'pos')
+
+    def __init__(self, days, time, pos=0):
+        self.days = days
+        self.time = time
+        self.pos = pos
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        pos = self.pos
+        if pos >= len(self.days):
+            raise StopIteration
+        self.pos = pos + 1
+        return datetime.combine(date.fromordinal(self.days[pos]), self.time)
+
+
+# rule parameters -> (days, time) or None, least recently used first
+_expanded = OrderedDict()
+EXPANDED_MAX = 256
+
+_RULE_PARAMS = ('_dtstart', '_freq', '_interval', '_wkst', '_until', '_count',
+                '_bysetpos', '_bymonth', '_bymonthday', '_bynmonthday',
+                '_byyearday', '_byeaster', '_byweekno', '_byweekday',
+                '_bynweekday', '_byhour', '_byminute', '_bysecond')
+
+
+def _rule_key(rule):
+    '''the parameters that decide an rrule's occurrences, hashable'''
+    key = []
+    for name in _RULE_PARAMS:
+        v = getattr(rule, name)
+        key.append(tuple(sorted(v)) if isinstance(v, set) else v)
+    return tuple(key)
+
+
+def expand(rule):
+    '''(ordinal days, time of day) of every occurrence of a dateutil rrule
+
+    Expansions are cached by the rule's parameters, so the same rule built
+    again (e.g. in every point of a sweep) is only expanded once.  Rules
+    without an end or with a time zone, rules whose occurrences are at
+    different times of day and anything that is not an rrule give None.
+    '''
+    if not isinstance(rule, rrule) or (
+            rule._count is None and rule._until is None) or (
+            rule._dtstart.tzinfo is not None):
+        return None
+    key = _rule_key(rule)
+    try:
+        expanded = _expanded[key]
+        _expanded.move_to_end(key)
+        return expanded
+    except KeyError:
+        pass
+    days = array('l')
+    time = None
+    for when in rule:
+        if time is None:
+            time = when.time()
+        elif when.time() != time:
+            days = None
+            break
+        days.append(when.toordinal())
+    expanded = _expanded[key] = None if days is None else (days, time)
+    if len(_expanded) > EXPANDED_MAX:
+        _expanded.popitem(last=False)
+    return expanded
+
+
+def occurrences(recur, last=None):
+    '''iterate recur from its first occurrence after last (all if None)'''
+    expanded = expand(recur)
+    if expanded is not None:
+        days, time = expanded
+        pos = 0
+        if last is not None:
+            day = last.toordinal()
+            # an occurrence later on last's own day is still to come
+            pos = bisect_right(days, day if last.time() >= time else day - 1)
+        return Occurrences(days, time, pos)
+    if last is None:
+        return iter(recur)
+    if hasattr(recur, 'xafter'):  # dateutil rrule and rruleset
+        return recur.xafter(last)
+    return (when for when in recur if when > last)
+
+
+def reset_counters(tid=0, order=0):
+    '''restart the transaction ids and Recurring order numbers
+
+    Both are class-level counters shared by every Ledger and Recurring in
+    the process; a sweep worker resets them before each run so its results
+    do not depend on what that worker ran before.
+    '''
+    Ledger._nextid = iter(counter(tid)).__next__
+    Recurring.nextid = iter(counter(order)).__next__
+
 
 class Echo(Recurring):
 
@@ -369,18 +1178,14 @@ class BCM(Recurring):
 
 
 class Mission(Recurring):
+    PURE = True
 
     def __init__(self, recur, amount):
         super(Mission, self).__init__(recur)
         self.amount = amount
 
     def service(self, ledger, when):
-        source = ledger.get_account('midterm fund')
-        destination = ledger.get_account('missionary')
-        t = ledger.enter(when, 'pay mission fund',
-                         Debit(when, destination, self.amount),
-                         Credit(when, source, self.amount),)
-        return t
+        return paymission(ledger, when, self.amount)
 
 
 class Tithing(Recurring):
@@ -390,13 +1195,14 @@ class Tithing(Recurring):
 
 
 class Savings(Recurring):
+    CLOSED_FORM = True
 
     def __init__(self, recur, src, dest, rate):
         super(Savings, self).__init__(recur)
         self.src = src
         self.dest = dest
         self.rate = rate
-        self.pbal = ZERO
+        self.pbal = 0
         self.transactions = []
 
     def add(self, ledger, now, source, amount):
@@ -409,7 +1215,8 @@ class Savings(Recurring):
 
     def service(self, ledger, now):
         # print(now,self.pbal,ledger.get_balance(self.dest))
-        intr = (self.rate * self.pbal).quantize(ZERO)  # conservative estimate
+        money = ledger.money
+        intr = money.round(money.mul(self.pbal, self.rate))  # conservative estimate
         if intr > ZERO:
             self.transactions.append(
                 ledger.enter(now, 'interest received',
@@ -419,8 +1226,33 @@ class Savings(Recurring):
 
         self.pbal = ledger.get_balance(self.dest)
 
+    def advance(self, ledger, dates):
+        # the first period earns interest on pbal as service() does, the
+        # rest compound on the balance; rounded once, so a cent or so off
+        # the period-by-period total
+        money = ledger.money
+        intr = max(money.round(money.mul(self.pbal, self.rate)), money.ZERO)
+        bal = ledger.get_balance(self.dest) + intr
+        if bal > ZERO:
+            growth = (1 + self.rate) ** (len(dates) - 1) - 1
+            intr += money.round(money.mul(bal, growth, cache=False))
+        if intr > ZERO:
+            now = dates[-1]
+            self.transactions.append(
+                ledger.enter(now, 'interest received, {} periods'.format(
+                    len(dates)),
+                             Debit(now, self.dest, intr),
+                             Credit(now, self.src, intr)
+                             ))
+
+        self.pbal = ledger.get_balance(self.dest)
+
+    def accounts(self, ledger):
+        return {self.src, self.dest}
+
 
 class Paycheck(Recurring):
+    PURE = True
 
     def __init__(self, recur, name, hours, rate):
         super(Paycheck, self).__init__(recur)
@@ -433,62 +1265,69 @@ class Paycheck(Recurring):
 
 
 def payday(ledger, now, hours, rate, source):
-    gross = (hours * rate).quantize(ZERO)
-    tithe = gross * TITHE
-    fit = (gross * TITHE).quantize(ZERO)  # XXX too simple
-    fica = (gross * FICA).quantize(ZERO)
-    medi = (gross * MEDI).quantize(ZERO)
+    money = ledger.money
+    gross = money.amount(hours * rate)
+    tithe = money.mul(gross, TITHE)
+    fit = money.round(money.mul(gross, TITHE))  # XXX too simple
+    fica = money.round(money.mul(gross, FICA))
+    medi = money.round(money.mul(gross, MEDI))
     net = gross - fica - medi - fit
 
     cash = ledger.get_account('cash')
 
     income = ledger.get_account('w-2 income')
     ttp = ledger.get_account('allocated tithing')
-    ledger.enter(now, 'paycheck from {}'.format(source),
-                 Entry(now, now, cash, True, net, 'net deposit'),
-                 Entry(now, now, ledger.get_account('Federal Income Tax'), True, fit,
-                       'Federal income tax deducted'),
-                 Entry(now, now, ledger.get_account('FICA'), True, fica,
-                       'FICA payroll tax deducted'),
-                 Entry(now, now, ledger.get_account('Medicare'), True, medi,
-                       'Medicare payroll tax deducted'),
-                 Entry(now, now, income, False, gross,
-                       'gross pay: {} hours @ ${}'.format(hours, rate)),
-                 )
-
-    ledger.enter(now, 'reserve tithing',
-                 Entry(now, now, ttp, True, tithe, None),
-                 Entry(now, now, cash, False, tithe, None),
-                 )
-
-    giving = tithe / 2
-    ledger.enter(now, 'reserve other giving',
-                 Entry(now, now, ledger.get_account(
-                     'allocated giving'), True, giving, None),
-                 Entry(now, now, cash, False, giving, None),
-                 )
+    giving = money.div(tithe, 2)
     saving = tithe + giving
-    ledger.enter(now, 'reserve saving',
-                 Entry(now, now, ledger.get_account(
-                     'allocated saving'), True, saving, None),
-                 Entry(now, now, cash, False, saving, None),
-                 )
+    ledger.enter_many([
+        (now, 'paycheck from {}'.format(source), (
+            Entry(now, now, cash, True, net, 'net deposit'),
+            Entry(now, now, ledger.get_account('Federal Income Tax'), True, fit,
+                  'Federal income tax deducted'),
+            Entry(now, now, ledger.get_account('FICA'), True, fica,
+                  'FICA payroll tax deducted'),
+            Entry(now, now, ledger.get_account('Medicare'), True, medi,
+                  'Medicare payroll tax deducted'),
+            Entry(now, now, income, False, gross,
+                  'gross pay: {} hours @ ${}'.format(hours, rate)),
+        )),
+        (now, 'reserve tithing', (
+            Entry(now, now, ttp, True, tithe, None),
+            Entry(now, now, cash, False, tithe, None),
+        )),
+        (now, 'reserve other giving', (
+            Entry(now, now, ledger.get_account(
+                'allocated giving'), True, giving, None),
+            Entry(now, now, cash, False, giving, None),
+        )),
+        (now, 'reserve saving', (
+            Entry(now, now, ledger.get_account(
+                'allocated saving'), True, saving, None),
+            Entry(now, now, cash, False, saving, None),
+        )),
+    ])
 
     return gross
 
 
-def paytithing(ledger, now):
+def tithing_due(ledger, now):
+    '''(dtorigin, memo, entries) paying what is allocated for tithing'''
     ttp = ledger.get_account('allocated tithing')
     tp = ledger.get_account('tithing')
-    amount = ledger.get_balance(ttp).quantize(ZERO)
+    amount = ledger.money.round(ledger.get_balance(ttp))
     if amount > ZERO:
-        t = ledger.enter(now, 'pay thithing',
-                         Debit(now, tp, amount),
-                         Credit(now, ttp, amount),)
-        return t
+        return (now, 'pay thithing', (Debit(now, tp, amount),
+                                      Credit(now, ttp, amount)))
+
+
+def paytithing(ledger, now):
+    due = tithing_due(ledger, now)
+    if due is not None:
+        return ledger.enter(due[0], due[1], *due[2])
 
 
 def paymission(ledger, now, amount):
+    amount = ledger.money.amount(amount)
     source = ledger.get_account('midterm fund')
     destination = ledger.get_account('missionary')
     t = ledger.enter(now, 'pay mission fund',
@@ -498,72 +1337,7 @@ def paymission(ledger, now, amount):
 
 
 def bcm1(ledger, now, efundlevel=D('500.00')):
-    paytithing(ledger, now)
-    efund = ledger.get_account('emergency fund')
-    ebal = ledger.get_balance(efund)
-    cash = ledger.get_account('cash')
-    cashbal = ledger.get_balance(cash)
-    save = ledger.get_account('allocated saving')
-    savebal = ledger.get_balance(save)
-    eneed = efundlevel - ebal
-    if eneed > ZERO:
-        if eneed > savebal:
-            if cashbal > ZERO:
-                avail = cashbal + savebal
-                if avail < eneed:
-                    ee = [
-                        Debit(now, efund, avail),
-                        Credit(now, save, savebal),
-                        Credit(now, cash, cashbal),
-                    ]
-                    savebal = cashbal = ZERO
-                else:
-                    sc = eneed - savebal
-                    ee = [
-                        Debit(now, efund, eneed),
-                        Credit(now, save, savebal),
-                        Credit(now, cash, sc),
-                    ]
-                    savebal = ZERO
-                    cashbal -= sc
-            else:
-                ee = [
-                    Debit(now, efund, savebal),
-                    Credit(now, save, savebal),
-                ]
-                savebal = ZERO
-        else:
-            ee = [
-                Debit(now, efund, eneed),
-                Credit(now, save, eneed),
-            ]
-            savebal -= eneed
-
-        ledger.enter(now, 'transfer to emergency fund', *ee)
-
-    if cashbal > ZERO:
-        lfund = ledger.get_account('allocated living')
-        lneed = cashbal * D('0.03')  # 3 percent of disposable income
-
-        if lneed > ZERO:
-            ledger.enter(now, 'allocate for living expenses',
-                         Debit(now, lfund, lneed),
-                         Credit(now, cash, lneed),
-                         )
-            cashbal -= lneed
-        # sweep everything else into midterm savings
-        mfund = ledger.get_account('midterm fund')
-        ledger.enter(now, 'save for mission',
-                     Debit(now, mfund, cashbal),
-                     Credit(now, cash, cashbal),
-                     )
-
-    # sweep 15% saving into Roth IRA
-    save = ledger.get_account('allocated saving')
-    savebal = ledger.get_balance(save)
-    if savebal > ZERO:
-        rfund = ledger.get_account('Roth IRA')
-        ledger.enter(now, 'save for retirement',
-                     Debit(now, rfund, savebal),
-                     Credit(now, save, savebal),
-                     )
+    '''the weekly budget, rules.BCM1'''
+    from rules import BCM1, compiled
+    return compiled(BCM1, ledger.coa, ledger.money,
+                    efundlevel=efundlevel)(ledger, now)
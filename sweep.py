@@ -0,0 +1,83 @@
+# -*- coding: utf8 -*-
+'''run a scenario over a grid of parameters, in parallel
+
+    from scenario import household
+    points = sweep(household, grid(hours=[D('16.0'), D('40.0')],
+                                   efundlevel=[D('500'), D('1000')]))
+    for line in table(points, ['emergency fund', 'Roth IRA']):
+        print(line)
+
+Every point builds its own ChartofAccounts, Ledger and DateSelect in a
+worker process, so the scenario function must be importable by name.
+'''
+
+from __future__ import print_function, unicode_literals, division, absolute_import
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import product
+
+from simple import DateSelect, dollars, reset_counters
+
+Point = namedtuple('Point', 'params,balances,dates')
+
+
+def grid(**values):
+    '''every combination of the parameter values, as keyword dicts'''
+    names = list(values)
+    return [dict(zip(names, combo))
+            for combo in product(*(values[name] for name in names))]
+
+
+def run_point(build, params):
+    '''simulate one scenario, returning its end balances and milestones'''
+    reset_counters()
+    s = build(**params)
+    ledger = s.ledger
+    dates = dict.fromkeys(s.milestones)
+    pending = dict(s.milestones)
+    for v, what, when in DateSelect(s.recurring).service_loop(ledger, s.until):
+        for name, reached in list(pending.items()):
+            if reached(ledger):
+                dates[name] = when
+                del pending[name]
+    balances = {acct.name: dollars(bal) for acct, bal in ledger.balances.items()}
+    return Point(params, balances, dates)
+
+
+def sweep(build, points, workers=None, fixed=None):
+    '''run build(**params) for each params in points
+
+    fixed parameters are passed to every point.  With workers=1 the points
+    run here, one after another; otherwise in a process pool.
+    '''
+    points = [dict(fixed or {}, **params) for params in points]
+    run = partial(run_point, build)
+    if workers == 1:
+        return [run(params) for params in points]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run, points))
+
+
+def table(points, accounts, params=None):
+    '''format points as text lines: parameters, milestones, balances'''
+    if not points:
+        return []
+    if params is None:
+        params = list(points[0].params)
+    milestones = list(points[0].dates)
+    head = params + milestones + accounts
+    rows = []
+    for p in points:
+        row = [str(p.params.get(name, '')) for name in params]
+        for name in milestones:
+            when = p.dates[name]
+            row.append(when.strftime('%Y-%m-%d') if when else '-')
+        row.extend(str(p.balances.get(name, '0.00')) for name in accounts)
+        rows.append(row)
+    widths = [max(len(r[i]) for r in rows + [head]) for i in range(len(head))]
+    lines = ['  '.join(h.ljust(w) for h, w in zip(head, widths))]
+    for row in rows:
+        lines.append('  '.join(c.rjust(w) for c, w in zip(row, widths)))
+    return lines
@@ -0,0 +1,32 @@
+# -*- coding: utf8 -*-
+
+import argparse
+import json
+
+import bench
+
+
+def test_bench(tmp_path, capsys):
+    out = tmp_path / 'bench.json'
+    results = bench.main(['--years', '1', '--rules', '5', '--files', '2',
+                          '--size', '6', '--repeat', '1', '-o', str(out)])
+    assert [r['name'] for r in results] == list(bench.BENCHMARKS)
+    assert all(r['seconds'] > 0 and r['peak_kb'] >= 0 for r in results)
+    assert results[0]['ops'] == 4 * len(bench.paydays(1))
+    saved = json.loads(out.read_text())
+    assert saved['params']['years'] == 1
+    assert [r['name'] for r in saved['results']] == list(bench.BENCHMARKS)
+
+    bench.main(['enter', '--years', '1', '--repeat', '1',
+                '--compare', str(out)])
+    assert 'speedup' in capsys.readouterr().out.splitlines()[-2]
+
+
+def test_f1040ez_leaves_ledger():
+    run, ops, unit = bench.bench_f1040ez(argparse.Namespace(years=2,
+                                                            money='decimal'))
+    ledger = run.args[0]
+    before = len(ledger.transactions), ledger.balances.copy()
+    run()
+    run()
+    assert (len(ledger.transactions), ledger.balances) == before
@@ -0,0 +1,62 @@
+# -*- coding: utf8 -*-
+
+from datetime import date, datetime
+
+from simple import D, DateSelect, Paycheck, reset_counters
+from scenario import household
+from checkpoint import checkpoint, resume
+
+
+def run(ledger, ds, until, stop=None):
+    for v, what, when in ds.service_loop(ledger, until):
+        if stop is not None and when >= stop:
+            break
+
+
+def summary(ledger):
+    return ([(t.tid, t.dtposted, t.memo,
+              [(e.account.name, e.debit, e.amount) for e in t.entries])
+             for t in ledger.transactions],
+            sorted((a.name, b) for a, b in ledger.balances.items()))
+
+
+def test_resume():
+    reset_counters()
+    s = household(years=2, mission=date(2015, 6, 1))
+    ds = DateSelect(s.recurring)
+    run(s.ledger, ds, s.until)
+    whole = summary(s.ledger)
+
+    reset_counters()
+    s = household(years=2, mission=date(2015, 6, 1))
+    ds = DateSelect(s.recurring)
+    run(s.ledger, ds, s.until, stop=datetime(2016, 1, 1))
+    data = checkpoint(s.ledger, ds)
+    run(s.ledger, ds, s.until)
+    assert summary(s.ledger) == whole
+
+    # resuming twice gives two independent copies of the prefix
+    for n in range(2):
+        ledger, ds = resume(data)
+        run(ledger, ds, s.until)
+        assert summary(ledger) == whole
+
+
+def test_fork():
+    reset_counters()
+    s = household(years=2)
+    ds = DateSelect(s.recurring)
+    run(s.ledger, ds, s.until, stop=datetime(2016, 1, 1))
+    data = checkpoint(s.ledger, ds)
+    prefix = len(s.ledger.transactions)
+
+    cash = {}
+    for hours in (D('16.0'), D('40.0')):
+        ledger, ds = resume(data)
+        for when, r in ds.pending:
+            if isinstance(r, Paycheck):
+                r.hours = hours
+        run(ledger, ds, s.until)
+        assert summary(ledger)[0][:prefix] == summary(s.ledger)[0]
+        cash[hours] = ledger.get_balance(ledger.get_account('w-2 income'))
+    assert cash[D('16.0')] != cash[D('40.0')]
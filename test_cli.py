@@ -0,0 +1,32 @@
+# -*- coding: utf8 -*-
+
+import subprocess
+import sys
+
+from click.testing import CliRunner
+
+from myfi.cli import cli
+
+
+def test_help_is_lazy():
+    code = ('import sys\n'
+            'from myfi.cli import cli\n'
+            'try:\n'
+            '    cli(["--help"])\n'
+            'except SystemExit:\n'
+            '    pass\n'
+            'print(sorted(m for m in sys.modules'
+            ' if m.split(".")[0] in ("sqlalchemy", "ofxparse", "numpy")))\n')
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True,
+                         text=True, check=True).stdout
+    assert 'loadofx' in out
+    assert out.splitlines()[-1] == '[]'
+
+
+def test_init(tmp_path):
+    db = tmp_path / 'myfi.db'
+    result = CliRunner().invoke(cli, ['-d', str(db), 'init'])
+    assert result.exit_code == 0
+    assert db.exists()
+    result = CliRunner().invoke(cli, ['nosuch'])
+    assert result.exit_code != 0
@@ -0,0 +1,129 @@
+# -*- coding: utf8 -*-
+
+from datetime import datetime
+
+from dateutil.rrule import rrule, MONTHLY
+
+from simple import *
+from debt import Loan, LoanPayments, avalanche, opening, optimize, snowball
+
+coa = ChartofAccounts()
+coa.load_csv('accounts.csv')
+for number, name in (('221', 'car loan'), ('222', 'visa'),
+                     ('223', 'student loan')):
+    coa.add(LiabilityAccount(name, number))
+
+loans = [Loan(coa.get('car loan'), '8500.00', '0.049', '180.00'),
+         Loan(coa.get('visa'), '2300.00', '0.219', '60.00'),
+         Loan(coa.get('student loan'), '14000.00', '0.068', '160.00')]
+
+
+def simulate(order, extra, money=DECIMAL):
+    ledger = Ledger(coa, opening(loans, money), money)
+    payments = LoanPayments(rrule(MONTHLY, dtstart=datetime(2020, 1, 1),
+                                  count=600),
+                            loans, coa.get('cash'), extra, order)
+    months = 0
+    for v, what, when in DateSelect([payments]).service_loop(
+            ledger, datetime(2070, 1, 1)):
+        months += 1
+        if all(ledger.get_balance(loan.account) <= 0 for loan in loans):
+            break
+    return months, dollars(ledger.get_balance(coa.get('interest paid')))
+
+
+def test_orders():
+    assert [l.name for l in snowball(loans)] == ['visa', 'car loan',
+                                                 'student loan']
+    assert [l.name for l in avalanche(loans)] == ['visa', 'student loan',
+                                                  'car loan']
+
+
+def test_optimize_matches_ledger():
+    custom = loans[::-1]
+    plans = optimize(loans, [0, 100, 250],
+                     orders=('snowball', 'avalanche', custom))
+    assert len(plans) == 9
+    assert [p.extra for p in plans[:3]] == [250, 250, 250]
+    assert plans[-1].extra == 0
+    for plan in plans:
+        order = custom if plan.order == 'custom' else plan.order
+        for money in (DECIMAL, CENTS):
+            months, interest = simulate(order, plan.extra, money)
+            # float dollars against cents: the odd half cent rounds apart
+            assert months == plan.months
+            assert abs(interest - plan.interest) <= D('0.25')
+    best = plans[0]
+    assert best.order == 'avalanche'
+    assert best.months == max(best.payoff.values())
+
+
+def test_fast_forward():
+    for money in (DECIMAL, CENTS):
+        for order in ('snowball', 'avalanche'):
+            ledgers = []
+            for fast in (False, True):
+                ledger = Ledger(coa, opening(loans, money), money)
+                payments = LoanPayments(
+                    rrule(MONTHLY, dtstart=datetime(2020, 1, 1), count=120),
+                    loans, coa.get('cash'), 100, order)
+                for v in DateSelect([payments], fast).service_loop(
+                        ledger, datetime(2040, 1, 1)):
+                    pass
+                ledgers.append(ledger)
+            slow, fast = ledgers
+            assert len(fast.transactions) < len(slow.transactions) / 4
+            for loan in loans:
+                assert fast.get_balance(loan.account) == money.ZERO
+            spent = [dollars(l.get_balance(coa.get('cash'))) for l in ledgers]
+            assert abs(spent[0] - spent[1]) <= D('0.10')
+
+
+def test_fast_forward_shared_account():
+    # the payments come out of cash: interest on cash can't be run ahead
+    # of them (nor they of it), interest on the emergency fund can
+    cash = coa.get('cash')
+    earned = coa.get('interest earned')
+    start = datetime(2020, 1, 1)
+    for acct in (cash, coa.get('emergency fund')):
+        ledgers = []
+        for fast in (False, True):
+            balances = opening(loans[:1])
+            balances[acct] = D('20000.00')
+            ledger = Ledger(coa, balances)
+            payments = LoanPayments(rrule(MONTHLY, dtstart=start, count=60),
+                                    loans[:1], cash)
+            savings = Savings(rrule(MONTHLY, dtstart=start, count=60),
+                              earned, acct, D('0.05') / 12)
+            for v in DateSelect([payments, savings], fast).service_loop(
+                    ledger, datetime(2025, 1, 1)):
+                pass
+            ledgers.append(ledger)
+        slow, fast = ledgers
+        for a in (cash, earned):
+            assert abs(slow.get_balance(a) - fast.get_balance(a)) <= D('0.50')
+        if acct is cash:
+            assert len(fast.transactions) == len(slow.transactions)
+        else:
+            assert len(fast.transactions) < len(slow.transactions) / 4
+
+
+def test_fast_forward_rate_cache():
+    # each stretch run ahead has its own growth factor: those must not
+    # pile up in the money's cache of rates
+    money = FixedMoney()
+    cash = coa.get('cash')
+    efund = coa.get('emergency fund')
+    start = datetime(2020, 1, 1)
+    balances = opening(loans, money)
+    balances[efund] = money.amount('20000.00')
+    ledger = Ledger(coa, balances, money)
+    rate = D('0.05') / 12
+    recurring = [LoanPayments(rrule(MONTHLY, dtstart=start, count=240),
+                              loans, cash, 100),
+                 Savings(rrule(MONTHLY, dtstart=start, count=240),
+                         coa.get('interest earned'), efund, rate)]
+    for v in DateSelect(recurring, True).service_loop(
+            ledger, datetime(2040, 1, 1)):
+        pass
+    assert set(money._ratios) <= {loan.apr / 12 for loan in loans} | {rate}
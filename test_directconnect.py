@@ -0,0 +1,160 @@
+# -*- coding: utf8 -*-
+
+import asyncio
+import datetime
+import re
+from decimal import Decimal
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from myfi.directconnect import (ConnectionPool, DownloadError, Fetcher,
+                                Institution, Source, StatementError,
+                                load_responses)
+from myfi.models import Base
+from myfi.ofxgen import HEADER, statement, synthetic
+
+SIGNON_ERROR = (HEADER + '<OFX>\n<SIGNONMSGSRSV1><SONRS><STATUS><CODE>15500'
+                '<SEVERITY>ERROR<MESSAGE>Signon invalid</STATUS>'
+                '<DTSERVER>20160101<LANGUAGE>ENG</SONRS></SIGNONMSGSRSV1>\n'
+                '</OFX>\n')
+
+
+class StandIn:
+    """A local OFX server: answers each statement request with a synthetic
+    statement for the ACCTID asked for, over keep-alive connections.
+
+    The first fail requests get a 503 and the ACCTIDs in refuse a signon
+    error; counts connections and the most requests handled at once.
+    """
+
+    def __init__(self, fail=0, delay=0.01, refuse=()):
+        self.fail = fail
+        self.delay = delay
+        self.refuse = refuse
+        self.connections = 0
+        self.requests = 0
+        self.active = 0
+        self.most = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(
+            self.handle, '127.0.0.1', 0)
+        return 'http://127.0.0.1:{}/ofx'.format(
+            self.server.sockets[0].getsockname()[1])
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line == b'\r\n':
+                        break
+                    name, _, value = line.decode().partition(':')
+                    if name.lower() == 'content-length':
+                        length = int(value)
+                body = (await reader.readexactly(length)).decode()
+                await self.respond(writer, body)
+        finally:
+            writer.close()
+
+    async def respond(self, writer, body):
+        self.requests += 1
+        self.active += 1
+        self.most = max(self.most, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        if self.fail:
+            self.fail -= 1
+            writer.write(b'HTTP/1.1 503 Busy\r\nContent-Length: 0\r\n\r\n')
+            return
+        acctid = re.search(r'<ACCTID>([^<\n]*)', body).group(1)
+        start = re.search(r'<DTSTART>(\d{8})', body).group(1)
+        start = datetime.datetime.strptime(start, '%Y%m%d').date()
+        if acctid in self.refuse:
+            ofx = SIGNON_ERROR.encode()
+        else:
+            ofx = statement('324377516', acctid,
+                            synthetic(10, start, seed=int(acctid)),
+                            Decimal('100.00')).encode()
+        writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/x-ofx\r\n'
+                     b'Content-Length: ' + str(len(ofx)).encode() +
+                     b'\r\n\r\n' + ofx)
+        await writer.drain()
+
+
+def run(server, sources, **kw):
+    async def main():
+        url = await server.start()
+        bank = Institution('bank', url, 'STANDIN', '1234', limit=2)
+        try:
+            fetcher = Fetcher(**kw)
+            got = await fetcher.fetch_all(
+                [Source(bank, '324377516', s, 'CHECKING', 'me', 'pw')
+                 for s in sources], datetime.date(2016, 1, 1))
+            await fetcher.close()
+            return got, fetcher.pool.opened
+        finally:
+            server.server.close()
+            await server.server.wait_closed()
+    return asyncio.run(main())
+
+
+def test_fetch_and_load():
+    server = StandIn(fail=2)
+    sources = [str(n) for n in range(1, 9)]
+    got, opened = run(server, sources, backoff=0.01)
+    assert all(isinstance(body, bytes) for body in got)
+    assert server.requests == 8 + 2
+    assert server.most <= 2
+    # two at a time, over two reused connections
+    assert opened == server.connections == 2
+
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    assert load_responses(session, got) == []
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql(
+            'select count(*) from accounts').scalar() == 8
+        assert conn.exec_driver_sql(
+            'select count(*) from entries').scalar() == 80
+
+
+def test_give_up():
+    server = StandIn(fail=10)
+    got, opened = run(server, ['1'], retries=2, backoff=0.01)
+    assert isinstance(got[0], DownloadError) and got[0].status == 503
+    assert server.requests == 3
+
+
+def test_ofx_error():
+    server = StandIn(refuse={'2'})
+    got, opened = run(server, ['1', '2', '3'])
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    (i, e), = load_responses(session, got)
+    assert i == 1 and isinstance(e, StatementError) and e.code == 15500
+    assert 'Signon invalid' in str(e)
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql(
+            'select count(*) from accounts').scalar() == 2
+
+
+class Stuck(ConnectionPool):
+    """A pool that never manages to connect."""
+
+    async def acquire(self, host, port, tls):
+        await asyncio.sleep(3600)
+
+
+def test_connect_timeout():
+    got, opened = run(StandIn(), ['1'], retries=1, backoff=0.01,
+                      timeout=0.05, pool=Stuck())
+    assert isinstance(got[0], asyncio.TimeoutError)
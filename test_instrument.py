@@ -0,0 +1,38 @@
+# -*- coding: utf8 -*-
+
+import json
+import pstats
+from datetime import date
+
+from simple import DateSelect, reset_counters
+from scenario import household
+from instrument import ServiceStats
+
+
+def test_service_stats(tmp_path):
+    reset_counters()
+    s = household(years=1, mission=date(2015, 6, 1))
+    stats = ServiceStats()
+    for v in DateSelect(s.recurring).service_loop(s.ledger, s.until, stats):
+        pass
+
+    rows = {row['name']: row for row in stats.rows()}
+    assert set(rows) == {'Paycheck', 'BCM(bcm1)', 'Savings', 'Mission'}
+    assert rows['Paycheck']['calls'] == 53
+    assert rows['Paycheck']['transactions'] == 4 * 53
+    assert rows['Savings']['calls'] == 3 * 13
+    assert sum(row['transactions'] for row in rows.values()) == \
+        len(s.ledger.transactions)
+    assert len(stats.rows('instance')) == 6
+    assert all(row['max'] <= row['seconds'] for row in rows.values())
+
+    lines = stats.table('instance')
+    assert lines[0].split()[:2] == ['name', 'calls']
+    assert len(lines) == 7
+    assert json.loads(stats.to_json()) == stats.rows()
+
+    prof = tmp_path / 'run.prof'
+    stats.dump_stats(str(prof))
+    p = pstats.Stats(str(prof))
+    assert p.total_calls == sum(row['calls'] for row in rows.values())
+    assert {key[2] for key in p.stats} == set(rows)
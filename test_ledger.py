@@ -0,0 +1,319 @@
+# -*- coding: utf8 -*-
+
+from datetime import date, datetime
+
+from simple import *
+
+coa = ChartofAccounts()
+coa.load_csv('accounts.csv')
+cash = coa.get('cash')
+income = coa.get('w-2 income')
+efund = coa.get('emergency fund')
+
+
+def deposit(ledger, when, amount):
+    return ledger.enter(when, 'deposit',
+                        Debit(when, cash, amount),
+                        Credit(when, income, amount))
+
+
+def test_point_in_time():
+    ledger = Ledger(coa, {cash: D('10.00')})
+    deposit(ledger, datetime(2016, 1, 7), D('100.00'))
+    deposit(ledger, date(2016, 3, 1), D('50.00'))
+    # entered late, dated between the other two
+    deposit(ledger, date(2016, 2, 1), D('25.00'))
+
+    assert ledger.get_balance(cash) == D('185.00')
+    assert ledger.get_balance(cash, as_of=date(2016, 1, 1)) == D('10.00')
+    assert ledger.get_balance(cash, as_of=date(2016, 1, 7)) == D('110.00')
+    assert ledger.get_balance(cash, as_of=date(2016, 2, 29)) == D('135.00')
+    assert ledger.get_balance(cash, as_of=date(2016, 3, 1)) == D('185.00')
+    assert ledger.get_balance(efund, as_of=date(2016, 3, 1)) == ZERO
+
+    register = ledger.postings(cash, date(2016, 1, 8), date(2016, 3, 1))
+    assert [p.balance for p in register] == [D('135.00'), D('185.00')]
+    assert [p.entry.amount for p in register] == [D('25.00'), D('50.00')]
+    assert len(ledger.postings(cash)) == 3
+
+
+def test_before_closing():
+    ledger = Ledger(coa)
+    deposit(ledger, date(2016, 12, 30), D('100.00'))
+    deposit(ledger, date(2017, 1, 1), D('7.00'))
+    mark = len(ledger.transactions)
+    closing_entries(ledger, date(2016, 12, 31))
+
+    assert ledger.get_balance(income) == D('7.00')
+    balances = ledger.balances_as_of(date(2016, 12, 31), before=mark)
+    assert balances[income] == D('100.00')
+    assert balances[cash] == D('100.00')
+    assert ledger.balances_as_of(date(2016, 12, 31))[income] == ZERO
+
+
+def test_journal():
+    from journal import Journal
+
+    def fill(ledger):
+        when = datetime(2015, 1, 1)
+        for week in range(10):
+            payday(ledger, when, D('16.0'), D('7.25'), 'IFA')
+            bcm1(ledger, when)
+        return [(t.dtposted, t.memo, [str(e) for e in t.entries])
+                for t in ledger.transactions]
+
+    for money in (DECIMAL, CENTS):
+        ledger = Ledger(coa, None, money, transactions=Journal(money))
+        assert fill(ledger) == fill(Ledger(coa, None, money))
+        assert ledger.transactions[-1].tid > ledger.transactions[0].tid
+        assert len(ledger.transactions[2:4]) == 2
+        register = ledger.postings(cash)
+        assert register[-1].balance == ledger.get_balance(cash)
+
+    # Decimal amounts read back exactly as they went in
+    amounts = [D('5.00'), D('5'), D('116.000'), D('0.0325'), D('1E+3'),
+               D('0.00'), D('-0.00'), D('1E+200'), D('2') / 3, D('-5.8'),
+               D('123456789012345678.9')]
+    ledger = Ledger(coa, None, transactions=Journal())
+    for amount in amounts:
+        deposit(ledger, date(2016, 1, 7), amount)
+    assert [str(t.entries[0].amount) for t in ledger.transactions] == \
+        [str(amount) for amount in amounts]
+
+
+def test_fork():
+    ledger = Ledger(coa, {cash: D('10.00')})
+    deposit(ledger, date(2016, 1, 7), D('100.00'))
+    deposit(ledger, date(2016, 2, 7), D('100.00'))
+
+    branch = ledger.fork()
+    deposit(branch, date(2016, 3, 7), D('5.00'))
+    deposit(ledger, date(2016, 3, 7), D('7.00'))
+    # entered late, into the shared part of the history
+    deposit(branch, date(2016, 1, 20), D('1.00'))
+    twig = branch.fork()
+    twig.enter(date(2016, 4, 1), 'save',
+               Debit(date(2016, 4, 1), efund, D('50.00')),
+               Credit(date(2016, 4, 1), cash, D('50.00')))
+
+    assert len(ledger.transactions) == 3
+    assert len(branch.transactions) == 4
+    assert len(twig.transactions) == 5
+    assert branch.transactions[:2] == ledger.transactions[:2]
+    assert branch.transactions[-1].memo == 'deposit'
+    assert list(twig.transactions)[:4] == list(branch.transactions)
+
+    assert ledger.get_balance(cash) == D('217.00')
+    assert branch.get_balance(cash) == D('216.00')
+    assert twig.get_balance(cash) == D('166.00')
+    assert ledger.get_balance(cash, as_of=date(2016, 2, 1)) == D('110.00')
+    assert branch.get_balance(cash, as_of=date(2016, 2, 1)) == D('111.00')
+    assert [p.balance for p in twig.postings(cash, date(2016, 3, 1))] == \
+        [D('216.00'), D('166.00')]
+
+    assert ledger.diff(branch) == {cash: (D('217.00'), D('216.00')),
+                                   income: (D('207.00'), D('206.00'))}
+    assert branch.diff(twig) == {cash: (D('216.00'), D('166.00')),
+                                 efund: (ZERO, D('50.00'))}
+
+
+def test_fork_shares_postings():
+    ledger = Ledger(coa, {cash: D('10.00')})
+    for month in range(1, 7):
+        deposit(ledger, date(2016, month, 7), D('100.00'))
+    branch = ledger.fork()
+    deposit(branch, date(2016, 7, 7), D('5.00'))
+    deposit(ledger, date(2016, 7, 7), D('7.00'))
+    # the branch only holds its own posting, past the six it shares
+    idx = branch.index[cash]
+    assert idx.base is ledger.index[cash] and len(idx.keys) == 1
+    assert len(idx) == 7 and len(ledger.index[cash]) == 7
+
+    twig = branch.fork()
+    assert twig.diff(branch) == {}
+    # entered late: each side copies the shared postings for itself
+    deposit(ledger, date(2016, 1, 20), D('1.00'))
+    deposit(twig, date(2016, 2, 20), D('2.00'))
+    assert ledger.get_balance(cash, as_of=date(2016, 3, 1)) == D('211.00')
+    assert branch.get_balance(cash, as_of=date(2016, 3, 1)) == D('210.00')
+    assert twig.get_balance(cash, as_of=date(2016, 3, 1)) == D('212.00')
+    assert [p.balance for p in branch.postings(cash, date(2016, 6, 1))] == \
+        [D('610.00'), D('615.00')]
+    assert [p.balance for p in twig.postings(cash, date(2016, 6, 1))] == \
+        [D('612.00'), D('617.00')]
+    assert branch.diff(twig) == {cash: (D('615.00'), D('617.00')),
+                                 income: (D('605.00'), D('607.00'))}
+
+
+def bonus(ledger, when):
+    deposit(ledger, when, D('1000.00'))
+
+
+def transfer(ledger, when):
+    ledger.enter(when, 'transfer to savings',
+                 Debit(when, efund, D('500.00')),
+                 Credit(when, cash, D('500.00')))
+
+
+def test_fast_forward():
+    from dateutil.rrule import rrule, MONTHLY, YEARLY
+    start = datetime(2020, 1, 1)
+    ledgers = []
+    for fast in (False, True):
+        reset_counters()
+        ledger = Ledger(coa, {efund: D('5000.00'), cash: D('1000.00')})
+        savings = Savings(rrule(MONTHLY, dtstart=start, count=240),
+                          coa.get('interest earned'), efund, D('0.05') / 12)
+        # the two yearly BCMs split every year into two runs of interest
+        yearly = BCM(rrule(YEARLY, dtstart=start, count=20), bonus)
+        midyear = BCM(rrule(YEARLY, dtstart=datetime(2020, 6, 15), count=20),
+                      transfer)
+        for v in DateSelect([savings, yearly, midyear], fast).service_loop(
+                ledger, datetime(2040, 1, 1)):
+            pass
+        ledgers.append(ledger)
+    slow, fast = ledgers
+    interest = [l for l in fast.transactions if 'periods' in l.memo]
+    assert len(interest) == 40
+    assert abs(slow.get_balance(efund) - fast.get_balance(efund)) <= D('0.50')
+    assert slow.get_balance(cash) == fast.get_balance(cash)
+
+
+class Tick(Recurring):
+
+    def service(self, ledger, when):
+        return self.order
+
+
+def test_same_date_order():
+    from dateutil.rrule import rrule, WEEKLY, MONTHLY
+    start = datetime(2020, 1, 1)
+    ticks = [Tick(rrule(WEEKLY if n % 3 else MONTHLY,
+                        dtstart=datetime(2020, 1, 1 + n % 5), count=10))
+             for n in range(30)]
+    expected = sorted((when, t.order) for t in ticks for when in t.recur)
+
+    ds = DateSelect(ticks[::-1])
+    assert ds.earliest() == start
+    assert ds.earliest_before(start) is None
+    assert ds.pending[:2] == [(start, ticks[0]), (start, ticks[5])]
+    seen = []
+    for v, what, when in ds.service_loop(None, datetime(2020, 3, 1)):
+        seen.append((when, v))
+    late = Tick(rrule(WEEKLY, dtstart=datetime(2020, 3, 4), count=2))
+    ds.add(late)
+    expected = sorted(expected + [(when, late.order) for when in late.recur])
+    for v, what, when in ds.service_loop(None, datetime(2021, 1, 1)):
+        seen.append((when, v))
+    assert seen == expected
+    assert ds.earliest() is None
+
+
+def test_occurrence_cache():
+    from dateutil.rrule import rrule, WEEKLY, TH
+    weekly = lambda **kw: rrule(WEEKLY, dtstart=datetime(2020, 1, 1, 9),
+                                byweekday=TH, **kw)
+    rule = weekly(count=20)
+    assert expand(rule) is expand(weekly(count=20))
+    assert expand(weekly()) is None
+    # a microsecond short of the last occurrence leaves it out
+    assert len(expand(weekly(until=datetime(2020, 2, 6, 9)))[0]) == 6
+    assert len(expand(weekly(
+        until=datetime(2020, 2, 6, 8, 59, 59, 999999)))[0]) == 5
+    assert list(occurrences(weekly(count=20))) == list(rule)
+    for last in (datetime(2020, 2, 6, 9), datetime(2020, 2, 6, 8),
+                 datetime(2020, 2, 6, 10), datetime(2020, 2, 7)):
+        assert list(occurrences(rule, last)) == list(rule.xafter(last))
+    forever = occurrences(weekly(), datetime(2020, 2, 6, 9))
+    assert next(forever) == datetime(2020, 2, 13, 9)
+
+
+def test_enter_many():
+    when = date(2016, 1, 7)
+    one, many = Ledger(coa, {cash: D('10.00')}), Ledger(coa, {cash: D('10.00')})
+    batch = [(when, 'deposit', (Debit(when, cash, D('100.00')),
+                                Credit(when, income, D('100.00')))),
+             (when, 'save', (Debit(when, efund, D('60.00')),
+                             Credit(when, cash, D('60.00')))),
+             (date(2016, 1, 1), 'late', (Debit(when, cash, D('1.00')),
+                                         Credit(when, income, D('1.00'))))]
+    for dtorigin, memo, entries in batch:
+        one.enter(dtorigin, memo, *entries)
+    trans = many.enter_many(batch)
+    assert [t.memo for t in trans] == ['deposit', 'save', 'late']
+    assert trans[1].tid == trans[0].tid + 1
+    assert many.balances == one.balances
+    for acct in (cash, income, efund):
+        assert [p.balance for p in many.postings(acct)] == \
+            [p.balance for p in one.postings(acct)]
+
+    bad = [(when, 'ok', (Debit(when, cash, D('1.00')),
+                         Credit(when, income, D('1.00')))),
+           (when, 'bad', (Debit(when, cash, D('1.00')),))]
+    try:
+        many.enter_many(bad)
+    except ValueError:
+        pass
+    else:
+        assert False, 'unbalanced batch entered'
+    assert len(many.transactions) == 3
+
+
+def test_statements():
+    tithing = coa.get('tithing')
+    ledger = Ledger(coa, {cash: D('10.00')})
+    deposit(ledger, date(2016, 3, 1), D('100.00'))
+    branch = ledger.fork()
+    when = date(2016, 3, 2)
+    branch.enter_many([(when, 'tithe', (Debit(when, tithing, D('10.00')),
+                                        Credit(when, cash, D('10.00'))))])
+
+    assert ledger.totals['asset'] == D('110.00')
+    assert branch.totals['asset'] == D('100.00')
+    assert branch.totals['expense'] == D('10.00')
+    assert ledger.kinds['expense'] == []
+    assert branch.kind_balances('expense') == [(tithing, D('10.00'))]
+    assert branch.kind_balances('revenue', as_of=date(2016, 2, 1)) == \
+        [(income, ZERO)]
+
+    stmt = income_statement(branch, datetime(2016, 12, 31))
+    assert stmt.revenue == [(income, D('100.00'))]
+    assert stmt.net_income == D('90.00')
+    closed, sheet = closing_entries(branch, date(2016, 12, 31))
+    assert closed == stmt
+    assert sheet.total_assets == D('100.00')
+    assert sheet.total_equity == D('90.00')
+    assert branch.totals['revenue'] == branch.totals['expense'] == ZERO
+    # assets = liabilities + equity (+ the opening cash), once closed
+    t = branch.totals
+    assert t['asset'] == t['liability'] + t['equity'] + D('10.00')
+    assert balance_sheet_lines(sheet)[-2].endswith('90.00')
+
+
+def test_account_groups():
+    assert [a.number for a in coa.group('11')] == \
+        ['110', '111', '112', '113', '114', '119']
+    assert [a.number for a in coa.between('150', '170')] == \
+        ['150', '155', '160']
+    assert coa.children('1') == ['11', '12', '13', '14', '15', '16', '17',
+                                 '18', '19']
+    assert coa.children('611') == ['611.1']
+    assert parent('611.1') == '611' and parent('111') == '11'
+    assert list(coa)[0].number == '110' and len(coa) == len(list(coa))
+
+    tithing = coa.get('tithing')
+    ledger = Ledger(coa, {efund: D('5.00')})
+    assert ledger.rollup('1') == D('5.00')
+    deposit(ledger, date(2016, 1, 7), D('100.00'))
+    when = date(2016, 1, 8)
+    ledger.enter_many([(when, 'tithe', (
+        Debit(when, coa.get('allocated tithing'), D('10.00')),
+        Credit(when, cash, D('10.00'))))])
+    assert ledger.rollup('11') == D('100.00')
+    assert ledger.rollup('1') == D('105.00')
+    branch = ledger.fork()
+    branch.enter(when, 'pay', Debit(when, tithing, D('10.00')),
+                 Credit(when, coa.get('allocated tithing'), D('10.00')))
+    assert branch.rollup('11') == branch.rollup('110') == D('90.00')
+    assert ledger.rollup('11') == D('100.00')
+    assert dict(branch.subtotals('5'))['51'] == D('10.00')
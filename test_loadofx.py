@@ -0,0 +1,196 @@
+# -*- coding: utf8 -*-
+
+import datetime
+import io
+import re
+from decimal import Decimal
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from myfi.balances import balance, history, reconcile
+from myfi.models import Base
+from myfi.ofxgen import statement, synthetic
+from myfi.loadofx import ImportCache, loadofx, loadstream, bulkload, read
+from myfi.ofxstream import stream
+
+
+def write_statements(tmp_path, count=3, size=20):
+    files = []
+    for n in range(count):
+        start = datetime.date(2016, 1, 1) + datetime.timedelta(30 * n)
+        path = tmp_path / 'stmt{}.ofx'.format(n)
+        path.write_text(statement('324377516', '644930~1',
+                                  synthetic(size, start, seed=n),
+                                  Decimal('100.00')))
+        files.append(str(path))
+    return files
+
+
+def dump(engine):
+    with engine.connect() as conn:
+        return [conn.exec_driver_sql(sql).fetchall() for sql in (
+            'select rtn, number, accttype from accounts order by id',
+            'select account_id, start_date, end_date, balance from statements'
+            ' order by id',
+            'select account_id, statement_id, dtposted, trntype, fitid,'
+            ' amount, checkno, name, memo from entries order by id',
+        )]
+
+
+def database():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def test_bulkload(tmp_path):
+    files = write_statements(tmp_path)
+    orm = database()
+    loadofx(sessionmaker(bind=orm)(), files)
+    bulk = database()
+    stats = bulkload(bulk, files, workers=2, batch=2)
+    assert stats['files'] == 3
+    assert stats['entries'] == 60
+    assert dump(bulk) == dump(orm)
+
+
+def test_overlapping(tmp_path):
+    files = []
+    for size in (20, 40, 30):
+        path = tmp_path / 'stmt{}.ofx'.format(size)
+        path.write_text(statement('324377516', '644930~1',
+                                  synthetic(size, seed=1), Decimal('1.00')))
+        files.append(str(path))
+
+    orm = database()
+    session = sessionmaker(bind=orm)()
+    loadofx(session, files[:1])
+    loadofx(session, files)
+
+    bulk = database()
+    stats = bulkload(bulk, files, workers=1, batch=2)
+    assert (stats['entries'], stats['skipped']) == (40, 50)
+    stats = bulkload(bulk, files, workers=1)
+    assert (stats['entries'], stats['skipped']) == (0, 90)
+
+    accounts, statements, entries = dump(bulk)
+    assert len(accounts) == 1
+    assert len(statements) == 3
+    assert len(entries) == len({e[4] for e in entries}) == 40
+    assert dump(orm) == dump(bulk)
+
+
+def test_retry(tmp_path, monkeypatch):
+    files = write_statements(tmp_path)
+    orm = database()
+    loadofx(sessionmaker(bind=orm)(), files)
+
+    def fail(*args):
+        raise RuntimeError('disk full')
+
+    # a failed import leaves nothing in the cache for its retry to skip
+    bulk = database()
+    streamed = database()
+    session = sessionmaker(bind=streamed)()
+    for name, load in (('refresh_entries', lambda cache: bulkload(
+                            bulk, files, workers=1, cache=cache)['entries']),
+                       ('refresh', lambda cache: loadstream(
+                            session, files, cache=cache))):
+        cache = ImportCache()
+        monkeypatch.setattr('myfi.loadofx.' + name, fail)
+        try:
+            load(cache)
+        except RuntimeError:
+            pass
+        else:
+            assert False, 'import did not fail'
+        monkeypatch.undo()
+        assert load(cache) == 60
+    assert dump(bulk) == dump(streamed) == dump(orm)
+
+
+def test_daily_balances(tmp_path):
+    files = write_statements(tmp_path)
+    engine = database()
+    bulkload(engine, files[1:], workers=1)
+    bulkload(engine, files[:1], workers=1)
+
+    with engine.connect() as conn:
+        entries = conn.exec_driver_sql(
+            'select dtposted, amount from entries order by dtposted').fetchall()
+        days = history(conn, 1)
+        assert len(days) == len({e[0] for e in entries})
+        for day, bal in days:
+            assert bal == sum(Decimal(str(a)) for d, a in entries
+                              if str(d) <= str(day))
+        last = days[-1]
+        assert balance(conn, 1, last[0] + datetime.timedelta(5)) == last[1]
+        assert balance(conn, 1, datetime.date(2015, 1, 1)) == 0
+        assert history(conn, 1, days[3][0], days[5][0]) == days[3:6]
+        stated = [Decimal('100.00') - balance(conn, 1, day) for day in
+                  conn.exec_driver_sql(
+                      'select end_date from statements order by id').scalars()]
+        assert [reconcile(conn, n) for n in (1, 2, 3)] == stated
+
+
+def as_xml(sgml):
+    """An OFX 2 version of an ofxgen statement: every element closed."""
+    body = sgml[sgml.index('<OFX>'):]
+    body = re.sub(r'<(\w+)>([^<\n]+)', r'<\1>\2</\1>', body)
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<?OFX OFXHEADER="200" VERSION="211" SECURITY="NONE"?>\n' + body)
+
+
+def test_stream(tmp_path):
+    files = write_statements(tmp_path, size=30)
+    orm = database()
+    loadofx(sessionmaker(bind=orm)(), files)
+    streamed = database()
+    session = sessionmaker(bind=streamed)()
+    assert loadstream(session, files, batch=7) == 90
+    assert loadstream(session, files) == 0
+    assert dump(streamed) == dump(orm)
+    with orm.connect() as a, streamed.connect() as b:
+        sql = 'select * from daily_balances order by account_id, day'
+        assert a.exec_driver_sql(sql).fetchall() == \
+            b.exec_driver_sql(sql).fetchall()
+
+    # the same records from XML, read in chunks that split every tag
+    sgml = open(files[0]).read().replace('SMITHS FOOD', 'SMITHS &amp; CO')
+    xml = as_xml(sgml)
+    records = [list(stream(io.BytesIO(text.encode()), size=size))
+               for text, size in ((sgml, 1 << 16), (xml, 5))]
+    assert records[0] == records[1]
+    assert len(records[0]) == 31 and records[0][-1][2] is None
+    assert any(r[2]['name'].startswith('smiths & co') for r in records[0][:-1])
+    assert records[0][0][1]['balance'] == Decimal('100.00')
+
+
+def streamed(text):
+    """stream()'s records of one statement as read() returns them"""
+    records = list(stream(io.BytesIO(text.encode())))
+    account, stmt, end = records[-1]
+    assert end is None
+    return account, stmt, [entry for a, s, entry in records[:-1]]
+
+
+def test_stream_like_read():
+    sgml = statement('324377516', '644930~1',
+                     synthetic(10, datetime.date(2016, 1, 1), seed=1),
+                     Decimal('100.00'))
+    # posted at 9pm EST: the next day in UTC, as ofxparse reads it
+    late = re.sub(r'<DTPOSTED>(\d{8})', r'<DTPOSTED>\g<1>210000.000[-5:EST]',
+                  sgml)
+    # a credit card statement has no BANKID
+    card = re.sub(r'<BANKID>\d+', '', sgml)
+    for old, new in (('BANKMSGSRSV1', 'CREDITCARDMSGSRSV1'),
+                     ('STMTTRNRS', 'CCSTMTTRNRS'), ('STMTRS', 'CCSTMTRS'),
+                     ('BANKACCTFROM', 'CCACCTFROM'),
+                     ('<ACCTTYPE>CHECKING', '')):
+        card = card.replace(old, new)
+    for text in (late, card):
+        assert streamed(text) == read(io.BytesIO(text.encode()))
+    assert streamed(late)[2][0]['dtposted'] == \
+        streamed(sgml)[2][0]['dtposted'] + datetime.timedelta(1)
+    assert streamed(card)[0] == dict(rtn='', number='644930~1', accttype=2)
@@ -0,0 +1,109 @@
+# -*- coding: utf8 -*-
+
+import os
+import subprocess
+import sys
+from datetime import datetime
+from dateutil.rrule import *
+
+from simple import *
+from f1040ez import f1040ez
+
+coa = ChartofAccounts()
+coa.load_csv('accounts.csv')
+
+
+def sweep(ledger, when):
+    roth = ledger.get_account('Roth IRA')
+    for name in ('allocated saving', 'allocated giving'):
+        acct = ledger.get_account(name)
+        bal = ledger.get_balance(acct)
+        if bal > ZERO:
+            ledger.enter(when, 'sweep {}'.format(name),
+                         Debit(when, roth, bal),
+                         Credit(when, acct, bal),
+                         )
+
+
+def run(money):
+    start = datetime(2015, 1, 1)
+    eoy = datetime(2015, 12, 31)
+    ds = DateSelect([
+        Paycheck(rrule(WEEKLY, dtstart=start, until=eoy, byweekday=TH),
+                 'IFA', D('16.0'), D('7.25')),
+        Tithing(rrule(MONTHLY, dtstart=start, bymonthday=-1, until=eoy)),
+        Savings(rrule(MONTHLY, dtstart=start, bymonthday=1, until=eoy),
+                coa.get('non-taxable interest'), coa.get('Roth IRA'),
+                D('0.12') / 12),
+        Savings(rrule(MONTHLY, dtstart=start, bymonthday=1, until=eoy),
+                coa.get('interest earned'), coa.get('cash'),
+                D('0.0065') / 12),
+        BCM(rrule(WEEKLY, dtstart=start, until=eoy, byweekday=FR), sweep),
+    ])
+    ledger = Ledger(coa, None, money)
+    for v in ds.service_loop(ledger, eoy):
+        pass
+    ledger.show_balances()
+    balances = ledger.balances.copy()
+    closing_entries(ledger, eoy)
+    f = f1040ez(ledger, balances, datetime(2016, 2, 1))
+    for k, v in sorted(f.items()):
+        print('{:5} {:>10}'.format(k, v))
+    return ledger
+
+
+def test_micros_matches_decimal(capsys):
+    run(DECIMAL)
+    decimal_report = capsys.readouterr().out
+    ledger = run(MICROS)
+    micros_report = capsys.readouterr().out
+    assert micros_report == decimal_report
+    assert all(type(v) is int for v in ledger.balances.values())
+
+
+def test_micros_matches_decimal_recur():
+    # the whole test_recur plan: bcm1, giveaway, tithe / 2, year ends
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    def report(*args):
+        return subprocess.run(
+            [sys.executable, os.path.join(here, 'test_recur.py')] + list(args),
+            cwd=here, stdout=subprocess.PIPE, check=True).stdout
+    assert report('micros') == report()
+
+
+def test_micros_rounding():
+    cent = MICROS.CENT
+    assert CENTS is MICROS
+    assert MICROS.amount(D('16.0') * D('7.25')) == 11600 * cent
+    assert MICROS.amount('0.005') == 0
+    assert MICROS.amount('0.015') == 2 * cent
+    assert MICROS.mul(11601 * cent, TITHE) == 1160100 * 10
+    assert MICROS.round(MICROS.mul(11605 * cent, -TITHE)) == -1160 * cent
+    assert MICROS.div(1161 * cent, 2) == 5805000
+    assert MICROS.round(5805000) == 580 * cent
+    assert MICROS.mul(1, D('0.5')) == 0
+    assert dollars(-5 * cent) == D('-0.05')
+    assert dollars(5805000) == D('5.80')
+    assert str(dollars(123456 * cent)) == '1234.56'
+
+
+def test_micros_checks():
+    money = FixedMoney()
+    for n in range(money.CACHE + 10):
+        money.mul(100, D(n) / 7)
+    assert len(money._ratios) <= money.CACHE
+    money.mul(100, D('1.05') ** 13, cache=False)
+    assert len(money._ratios) <= 10
+
+    ledger = Ledger(coa, None, MICROS)
+    cash = coa.get('cash')
+    when = datetime(2016, 1, 7)
+    try:
+        ledger.enter(when, 'deposit', Debit(when, cash, D('5.00')),
+                     Credit(when, coa.get('w-2 income'), D('5.00')))
+    except TypeError as e:
+        assert 'money.amount' in str(e)
+    else:
+        assert False
+    assert not ledger.transactions
@@ -0,0 +1,43 @@
+# -*- coding: utf8 -*-
+
+from datetime import datetime
+from dateutil.rrule import *
+
+from simple import *
+from montecarlo import *
+
+coa = ChartofAccounts()
+coa.load_csv('accounts.csv')
+
+
+def test_montecarlo():
+    start = datetime(2015, 1, 1)
+    until = datetime(2035, 1, 1)
+    monthly = rrule(MONTHLY, dtstart=start, bymonthday=1, until=until)
+    roth = Savings(monthly, coa.get('non-taxable interest'),
+                   coa.get('Roth IRA'), D('0.06') / 12)
+    ds = DateSelect([
+        Paycheck(rrule(WEEKLY, dtstart=start, until=until, byweekday=TH),
+                 'IFA', D('40.0'), D('13.57')),
+        roth,
+        BCM(rrule(WEEKLY, dtstart=start, until=until, byweekday=TH), bcm1),
+    ])
+    ledger = Ledger(coa, None, CENTS)
+    for v in ds.service_loop(ledger, until):
+        pass
+    final = float(dollars(ledger.get_balance(roth.dest)))
+    months = list(monthly)
+
+    fixed = montecarlo(ledger, [roth], months, FixedReturns(roth.rate), 2)
+    assert abs(fixed.balances[roth.dest][0, -1] - final) < final * 0.001
+
+    model = NormalReturns(0.06, 0.15)
+    sim = montecarlo(ledger, [roth], months, model, paths=1000, seed=7)
+    again = montecarlo(ledger, [roth], months, model, paths=1000, seed=7)
+    assert (sim.balances[roth.dest] == again.balances[roth.dest]).all()
+    low, mid, high = sim.percentiles(roth.dest, (5, 50, 95))[:, -1]
+    assert low < mid < high
+    assert sim.probability(roth.dest, 0) == 1.0
+    assert sim.probability(roth.dest, high) <= 0.05 + 1e-9
+    early = sim.probability(roth.dest, mid, when=datetime(2025, 1, 15))
+    assert early < sim.probability(roth.dest, mid)
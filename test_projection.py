@@ -0,0 +1,60 @@
+# -*- coding: utf8 -*-
+
+from datetime import datetime
+from dateutil.rrule import *
+
+from simple import *
+from projection import project
+
+coa = ChartofAccounts()
+coa.load_csv('accounts.csv')
+
+start = datetime(2015, 1, 1)
+until = datetime(2025, 1, 1)
+samples = [datetime(2014, 12, 31), start, datetime(2015, 1, 8),
+           datetime(2017, 6, 30), datetime(2020, 2, 29), datetime(2024, 12, 31)]
+
+
+def schedule(stateful):
+    recurring = [
+        Paycheck(rrule(WEEKLY, dtstart=start, until=until, byweekday=TH),
+                 'IFA', D('40.0'), D('13.57')),
+        Mission(rrule(MONTHLY, dtstart=start, until=until), D('45.00')),
+        Savings(rrule(MONTHLY, dtstart=start, bymonthday=1, until=until),
+                coa.get('interest earned'), coa.get('cash'),
+                D('0.0065') / 12),
+    ]
+    if stateful:
+        recurring.append(
+            BCM(rrule(WEEKLY, dtstart=start, until=until, byweekday=TH), bcm1))
+    return recurring
+
+
+def check(money, stateful):
+    looped = Ledger(coa, None, money)
+    for v in DateSelect(schedule(stateful)).service_loop(looped, until):
+        pass
+    projected = Ledger(coa, None, money)
+    p = project(projected, schedule(stateful), until)
+    assert projected.balances == looped.balances
+    assert p.final() == {k: v for k, v in looped.balances.items()
+                         if k in p.final()}
+    for when in samples:
+        for acct in p.accounts:
+            assert p.balance(acct, when) == looped.get_balance(acct, when), \
+                (acct, when)
+    return p
+
+
+def test_pure():
+    for money in (DECIMAL, MICROS):
+        p = check(money, False)
+    cash = coa.get('cash')
+    assert p.balance(cash, datetime(2014, 1, 1)) == 0
+    assert p.balance(cash, start) > 0
+    assert list(p.trajectory(cash)) == sorted(p.trajectory(cash))
+
+
+def test_stateful():
+    for money in (DECIMAL, MICROS):
+        check(money, True)
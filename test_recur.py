@@ -1,5 +1,7 @@
 # -*- coding: utf8 -*-
 
+import sys
+
 from dateutil.rrule import *
 from dateutil.relativedelta import *
 from datetime import date, datetime, timedelta
@@ -17,6 +19,8 @@ week = timedelta(7)
 from simple import *
 
 from f1040ez import f1040ez
+from reports import TextSink, form, write
+from rules import GIVEAWAY, compiled
 
 coa = ChartofAccounts()
 coa.load_csv('accounts.csv')
@@ -24,34 +28,18 @@ coa.load_csv('accounts.csv')
 
 def giveaway(ledger, when):
     yesterday = when + relativedelta(days=-1)
-    giving = ledger.get_account('allocated giving')
-    giveto = ledger.get_account('temple patron')
-    give = ledger.get_balance(giving)
-    if give > ZERO:
-        ledger.enter(yesterday, 'empty giving envelope',
-                     Debit(now, giveto, give),
-                     Credit(now, giving, give),
-                     )
-
-    living = ledger.get_account('allocated living')
-    liveto = ledger.get_account('misc expenses')
-    live = ledger.get_balance(living)
-    if live > ZERO:
-        ledger.enter(yesterday, 'empty living envelope',
-                     Debit(now, liveto, live),
-                     Credit(now, living, live),
-                     )
+    compiled(GIVEAWAY, ledger.coa, ledger.money)(ledger, yesterday)
 
 
 def yearend(ledger, when):
     yesterday = when + relativedelta(days=-1)
     print("\nyear end: {}".format(yesterday.date()))
 
-    balances = ledger.balances.copy()
+    mark = len(ledger.transactions)
     closing_entries(ledger, yesterday, 'year')
+    balances = ledger.balances_as_of(yesterday, before=mark)
     f = f1040ez(ledger, balances, when + relativedelta(months=1))
-    for k, v in sorted(f.items()):
-        print('{:5} {:>10}'.format(k, v))
+    write(form(f), TextSink(sys.stdout))
 
 t1 = now
 t2 = datetime(now.year, 6, 1) + relativedelta(days=1, weekday=TH)
@@ -106,7 +94,8 @@ ds = DateSelect([
     BCM(rrule(YEARLY, dtstart=t1 + relativedelta(years=1), until=t15), giveaway),
     BCM(startofyear, yearend),
 ])
-ledger = Ledger(coa, None)
+# python test_recur.py micros: the same plan in integer money
+ledger = Ledger(coa, None, MICROS if sys.argv[1:] == ['micros'] else DECIMAL)
 for v in ds.service_loop(ledger, eop):
     # print(v)
     pass
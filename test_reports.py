@@ -0,0 +1,80 @@
+# -*- coding: utf8 -*-
+
+import csv
+import io
+import json
+from datetime import date
+
+from simple import ChartofAccounts, Credit, D, Debit, Ledger
+from reports import (CSVSink, JSONLinesSink, TextSink, balances, form,
+                     journal, page, register, write)
+
+coa = ChartofAccounts()
+coa.load_csv('accounts.csv')
+cash = coa.get('cash')
+income = coa.get('w-2 income')
+efund = coa.get('emergency fund')
+
+
+def sample():
+    ledger = Ledger(coa, {cash: D('10.00')})
+    for month in range(1, 7):
+        when = date(2016, month, 1)
+        ledger.enter(when, 'pay', Debit(when, cash, D('100.00')),
+                     Credit(when, income, D('100.00')))
+        if month % 2 == 0:
+            ledger.enter(when, 'save', Debit(when, efund, D('30.00')),
+                         Credit(when, cash, D('30.00')))
+    return ledger
+
+
+def test_text_matches_show():
+    ledger = sample()
+    fo = io.StringIO()
+    # a tiny buffer, so the output is written in several pieces
+    write(journal(ledger), TextSink(fo, buffer=2))
+    assert fo.getvalue() == ''.join(str(t) + '\n' for t in ledger.transactions)
+
+    fo = io.StringIO()
+    write(balances(ledger), TextSink(fo))
+    assert fo.getvalue().splitlines()[0] == \
+        '{:30} {:>10}'.format(str(cash), '520.00')
+
+
+def test_filters_and_pages():
+    ledger = sample()
+    memos = lambda report: [t.memo for t in report.records]
+    assert memos(journal(ledger, accounts=['emergency fund'])) == ['save'] * 3
+    assert len(memos(journal(ledger, start=date(2016, 3, 1),
+                             end=date(2016, 4, 30)))) == 3
+    assert len(memos(journal(ledger, date(2016, 3, 1), date(2016, 4, 30),
+                             accounts=[cash, efund]))) == 3
+    assert len(memos(page(journal(ledger), 2, size=4))) == 4
+    assert len(memos(page(journal(ledger), 3, size=4))) == 1
+
+    fo = io.StringIO()
+    write(register(ledger, 'emergency fund'), TextSink(fo))
+    assert [l[-6:] for l in fo.getvalue().splitlines()] == \
+        [' 30.00', ' 60.00', ' 90.00']
+
+
+def test_csv_and_json_lines():
+    ledger = sample()
+    fo = io.StringIO(newline='')
+    write(journal(ledger, end=date(2016, 2, 1)), CSVSink(fo))
+    rows = list(csv.reader(io.StringIO(fo.getvalue())))
+    assert rows[0] == ['tid', 'date', 'memo', 'account', 'debit', 'credit',
+                       'note']
+    assert len(rows) == 1 + 3 * 2
+    assert rows[1][2:6] == ['pay', 'cash', '100.00', '']
+    assert rows[2][3:6] == ['w-2 income', '', '100.00']
+
+    fo = io.StringIO()
+    write(balances(ledger, as_of=date(2016, 1, 31), accounts=[cash]),
+          JSONLinesSink(fo))
+    assert [json.loads(l) for l in fo.getvalue().splitlines()] == \
+        [{'account': 'cash', 'balance': '110.00'}]
+
+    fo = io.StringIO()
+    write(form(dict(L01=D('1.00'), Form='1040ez')), TextSink(fo))
+    assert fo.getvalue() == 'Form      1040ez\nL01         1.00\n'
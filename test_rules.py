@@ -0,0 +1,113 @@
+# -*- coding: utf8 -*-
+
+import json
+from datetime import date
+
+from simple import *
+from rules import BCM1, compile_rules, compiled, load_rules
+
+coa = ChartofAccounts()
+coa.load_csv('accounts.csv')
+cash = coa.get('cash')
+save = coa.get('allocated saving')
+efund = coa.get('emergency fund')
+
+
+def test_fill(tmp_path):
+    rules = tmp_path / 'budget.json'
+    rules.write_text(json.dumps([
+        dict(op='fill', dest='emergency fund', level='level',
+             sources=['allocated saving', '110'], memo='fill'),
+        dict(op='allocate', source='cash', dest='allocated living',
+             rate='0.5', memo='half'),
+        dict(op='sweep', source='cash', dest='midterm fund', memo='rest'),
+    ]))
+    for money in (DECIMAL, CENTS):
+        program = compile_rules(load_rules(str(rules)), coa, money,
+                                level='500.00')
+        a = money.amount
+        ledger = Ledger(coa, {cash: a('400.00'), save: a('150.00'),
+                              efund: a('100.00')}, money)
+        program(ledger, date(2016, 1, 7))
+        assert [t.memo for t in ledger.transactions] == ['fill', 'half', 'rest']
+        assert [str(e.amount) for e in ledger.transactions[0].entries] == \
+            [str(a(x)) for x in ('400.00', '150.00', '250.00')]
+        assert ledger.get_balance(efund) == a('500.00')
+        assert ledger.get_balance(coa.get('allocated living')) == a('75.00')
+        assert ledger.get_balance(coa.get('midterm fund')) == a('75.00')
+        assert ledger.get_balance(cash) == money.ZERO
+
+        # full already: nothing to do
+        program(ledger, date(2016, 1, 14))
+        assert len(ledger.transactions) == 3
+
+
+def test_fill_short():
+    # sources at or below zero are passed over; bcm1 before the rules
+    # moved them anyway, as zero or negative credits
+    fill = [dict(op='fill', dest='emergency fund', level='500.00',
+                 sources=['allocated saving', 'cash'], memo='fill')]
+    for money in (DECIMAL, CENTS):
+        program = compile_rules(fill, coa, money)
+        a = money.amount
+        ledger = Ledger(coa, {cash: a('-50.00'), save: money.ZERO,
+                              efund: a('100.00')}, money)
+        program(ledger, date(2016, 1, 7))
+        assert not ledger.transactions
+
+        ledger = Ledger(coa, {cash: a('300.00'), save: a('-20.00'),
+                              efund: a('100.00')}, money)
+        program(ledger, date(2016, 1, 7))
+        assert [(e.account, e.amount) for e in ledger.transactions[0].entries] \
+            == [(efund, a('300.00')), (cash, a('300.00'))]
+        assert ledger.get_balance(save) == a('-20.00')
+
+
+def test_json_numbers(tmp_path):
+    # numbers in JSON are taken as written, not as binary floats
+    rules = tmp_path / 'budget.json'
+    rules.write_text('[{"op": "allocate", "source": "cash", "rate": 0.03,'
+                     ' "dest": "allocated living", "memo": "living"},'
+                     ' {"op": "fill", "dest": "emergency fund", "level": 0.1,'
+                     ' "sources": ["cash"], "memo": "fill"}]')
+    for money in (DECIMAL, CENTS):
+        program = compile_rules(load_rules(str(rules)), coa, money)
+        assert program.ops[0][3] == D('0.03')
+        assert program.ops[1][3] == money.amount('0.10')
+
+
+def test_errors():
+    try:
+        compile_rules([dict(op='sweep', source='cash', dest='nowhere',
+                            memo='x')], coa, DECIMAL)
+    except KeyError as e:
+        assert 'nowhere' in str(e)
+    else:
+        assert False
+    program = compile_rules(BCM1, coa, DECIMAL, efundlevel='500')
+    try:
+        program(Ledger(coa, None, CENTS), date(2016, 1, 7))
+    except ValueError:
+        pass
+    else:
+        assert False
+
+
+def test_compiled():
+    def run(rules):
+        ledger = Ledger(coa, {cash: D('10.00')})
+        compiled(rules, coa, DECIMAL)(ledger, date(2016, 1, 7))
+        return ledger.get_balance(coa.get(rules[0]['dest']))
+
+    def sweep(dest):
+        return [dict(op='sweep', source='cash', dest=dest, memo='sweep')]
+
+    # temporary lists, which may reuse each other's ids
+    assert run(sweep('midterm fund')) == D('10.00')
+    assert run(sweep('Roth IRA')) == D('10.00')
+    rules = sweep('midterm fund')
+    assert run(rules) == D('10.00')
+    rules[0]['dest'] = 'Roth IRA'
+    assert run(rules) == D('10.00')
+    assert compiled(BCM1, coa, CENTS, efundlevel=D('500')) is \
+        compiled(BCM1, coa, CENTS, efundlevel=D('500'))
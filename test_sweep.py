@@ -0,0 +1,24 @@
+# -*- coding: utf8 -*-
+
+from datetime import date
+
+from simple import D
+from scenario import household
+from sweep import grid, sweep, table
+
+
+def test_sweep():
+    points = grid(hours=[D('16.0'), D('40.0')], efundlevel=['500', '50000'])
+    assert len(points) == 4
+    fixed = dict(years=1, mission=date(2015, 6, 1))
+    serial = sweep(household, points, workers=1, fixed=fixed)
+    parallel = sweep(household, points, workers=2, fixed=fixed)
+    assert serial == parallel
+    assert serial[0].dates['emergency fund full'] is not None
+    assert serial[1].dates['emergency fund full'] is None
+    assert serial[0].balances['missionary'] == D('3600.00')
+    lines = table(serial, ['Roth IRA'], ['hours', 'efundlevel'])
+    assert len(lines) == 5
+    assert lines[0].split() == ['hours', 'efundlevel', 'emergency', 'fund',
+                                'full', 'midterm', 'fund', 'overdrawn',
+                                'Roth', 'IRA']